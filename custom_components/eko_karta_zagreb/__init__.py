@@ -1 +1,64 @@
 """A component for EKO KARTA ZAGREB (https://ekokartazagreb.stampar.hr/) weather and air-quality."""
+
+import voluptuous as vol
+
+from homeassistant.helpers import config_validation as cv
+
+from .const import CONF_PUBLISH, CONF_SOURCE
+
+DOMAIN = "eko_karta_zagreb"
+
+PLATFORMS = ["sensor", "weather", "air_quality"]
+
+CONFIG_SCHEMA = vol.Schema(
+    {
+        vol.Optional(DOMAIN): vol.Schema(
+            {
+                vol.Exclusive(CONF_SOURCE, "share"): vol.All(cv.url, lambda url: url.rstrip("/")),
+                vol.Exclusive(CONF_PUBLISH, "share"): cv.boolean,
+            }
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
+async def async_setup(hass, config):
+    """Set up the Eko Karta Zagreb component."""
+    conf = config.get(DOMAIN, {})
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if CONF_SOURCE in conf:
+        domain_data[CONF_SOURCE] = conf[CONF_SOURCE]
+
+    # Imported here, so loading the package for its DOMAIN stays cheap
+    from .backfill import async_setup_services
+
+    await async_setup_services(hass)
+
+    if conf.get(CONF_PUBLISH):
+        from .share import async_setup_publish
+
+        async_setup_publish(hass)
+    return True
+
+
+async def async_setup_entry(hass, entry):
+    """Set up a station from a config entry, without waiting for its first fetch."""
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+    return True
+
+
+async def async_unload_entry(hass, entry):
+    """Unload a config entry.
+
+    The station's coordinator and the station catalogue stay cached, so
+    reloading the entry neither fetches them again nor polls meanwhile -
+    a coordinator without entities stops polling.
+    """
+    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+
+async def async_reload_entry(hass, entry):
+    """Reload a config entry after its options changed."""
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -1,42 +1,42 @@
 """Air Quality for data from Eko Karta Zagreb."""
 import logging
-from datetime import timedelta
 import voluptuous as vol
 
 from homeassistant.components.air_quality import(
-    ATTR_AQI,
-    ATTR_CO,
-    ATTR_NO,
-    ATTR_NO2,
-    ATTR_OZONE,
-    ATTR_PM_0_1,
-    ATTR_PM_10,
-    ATTR_PM_2_5,
-    ATTR_SO2,
     PLATFORM_SCHEMA,
     AirQualityEntity,
 )
 from homeassistant.const import CONF_NAME, CONF_LATITUDE, CONF_LONGITUDE
 from homeassistant.helpers import config_validation as cv
 
-# Reuse data and API logic from the sensor implementation
-from .sensor import (
+from .coordinator import (
+    EkoKartaZagrebEntity,
+    async_get_coordinator,
+    async_get_coordinators,
+)
+from .const import (
     DEFAULT_NAME,
     CONF_STATION_ID,
-    EkoKartaZagrebData,
-    SENSOR_TYPES,
+    CONF_STATION_NAME,
+    CONF_STATIONS,
+    CONF_STATIONS_TTL,
+    DEFAULT_STATIONS_TTL,
+    STATIONS_ALL,
     ATTR_STATION,
     ATTR_UPDATED,
-    closest_station,
-    ekokartazagreb_stations,
 )
+from .stations import async_get_stations, resolve_station_ids, station_entity_name
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
-        vol.Optional(CONF_STATION_ID): cv.string,
+        vol.Exclusive(CONF_STATION_ID, "station"): cv.string,
+        vol.Exclusive(CONF_STATIONS, "station"): vol.Any(
+            STATIONS_ALL, vol.All(cv.ensure_list, [cv.string])
+        ),
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
+        vol.Optional(CONF_STATIONS_TTL, default=DEFAULT_STATIONS_TTL): cv.time_period,
         vol.Inclusive(
             CONF_LATITUDE, "coordinates", "Latitude and longitude must exist together"
         ): cv.latitude,
@@ -46,62 +46,77 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     }
 )
 
-SCAN_INTERVAL = timedelta(minutes=20)
-
-def setup_platform(hass, config, add_entities, discovery_info=None):
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the Eko Karta Zagreb weather platform."""
-    name = config.get(CONF_NAME)
-    station_id = config.get(CONF_STATION_ID)
-    latitude = config.get(CONF_LATITUDE, hass.config.latitude)
-    longitude = config.get(CONF_LONGITUDE, hass.config.longitude)
-
-    stations = ekokartazagreb_stations()
+    stations = await async_get_stations(hass, config[CONF_STATIONS_TTL])
     _LOGGER.debug("Loaded stations dict: %s", stations)
-    station_id = config.get(CONF_STATION_ID) 
-    if station_id:
-        _LOGGER.debug("Configuration station_id: %s", station_id)
-        if station_id not in stations:
-            _LOGGER.error("Configuration %s: %s , is not known", CONF_STATION_ID, station_id)
-            return False            
-    else:
-        station_id = closest_station(latitude, longitude, stations)
-        _LOGGER.debug("Found closest station_id: %s", station_id)
-
-    station_name = stations[station_id][2]
-    _LOGGER.debug("Determined station name: %s", station_name)
-
-    probe = EkoKartaZagrebData(station_id=station_id)
-    try:
-        probe.update()
-    except (ValueError, TypeError) as err:
-        _LOGGER.error("Received error from Eko Karta Zagreb: %s", err)
+    if not stations:
+        _LOGGER.error("No Eko Karta Zagreb stations available")
         return False
 
-    add_entities([EkoKartaZagrebAirQuality(probe, name, station_name)], True)
+    station_ids = resolve_station_ids(hass, config, stations)
+    if not station_ids:
+        return False
 
-class EkoKartaZagrebAirQuality(AirQualityEntity):
+    # Many stations' first fetches, spaced by the limiter, could outlast Home Assistant's
+    # platform setup timeout. Their entities become available after the first refresh instead.
+    coordinators = await async_get_coordinators(hass, station_ids, wait=len(station_ids) == 1)
+    if not coordinators:
+        return False
+
+    async_add_entities(
+        [
+            EkoKartaZagrebAirQuality(
+                coordinator,
+                station_entity_name(config, stations, coordinator.station_id),
+                stations[coordinator.station_id][2],
+            )
+            for coordinator in coordinators
+        ]
+    )
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the Eko Karta Zagreb air quality entity of a config entry."""
+    station_id = entry.data[CONF_STATION_ID]
+    # Added at once, the entity becomes available after the first refresh in the background
+    coordinator = await async_get_coordinator(hass, station_id, wait=False)
+    async_add_entities(
+        [
+            EkoKartaZagrebAirQuality(
+                coordinator,
+                entry.data[CONF_NAME],
+                entry.data[CONF_STATION_NAME],
+                unique_id=station_id,
+            )
+        ]
+    )
+
+class EkoKartaZagrebAirQuality(EkoKartaZagrebEntity, AirQualityEntity):
     """Representation of a air quality condition."""
 
-    def __init__(self, eko_karta_zagreb_data, name, station_name):
-        """Initialise the platform with a data instance and station name."""
+    watched_fields = frozenset(
+        (
+            "airIndex",
+            "pm25",
+            "pm10",
+            "pm1",
+            "o3",
+            "co",
+            "so2",
+            "no0",
+            "no2",
+            "locationName",
+            "measurementDate",
+        )
+    )
+
+    def __init__(self, coordinator, name, station_name, unique_id=None):
+        """Initialise the platform with a shared coordinator and station name."""
+        super().__init__(coordinator, unique_id, station_name)
         _LOGGER.debug("Initialized.")
-        self.eko_karta_zagreb_data = eko_karta_zagreb_data
         self._name = name
-        self._state = self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_AQI][4])
-        self._last_update = self.eko_karta_zagreb_data.last_update
         self._station_name = station_name
 
-    def update(self):
-        """Update current conditions."""
-        _LOGGER.debug("Update - called.")
-        self.eko_karta_zagreb_data.update()
-        if self._last_update != self.eko_karta_zagreb_data.last_update:
-            _LOGGER.debug("Update - updated from last date found.")
-            self._last_update = self.eko_karta_zagreb_data.last_update
-            self._state = self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_AQI][4])
-        else:
-            _LOGGER.debug("Update - no update found.")
-    
     @property
     def name(self):
         """Return the name of the sensor."""
@@ -110,7 +125,7 @@ class EkoKartaZagrebAirQuality(AirQualityEntity):
     @property
     def state(self):
         """Return the state of the sensor."""
-        return self._state
+        return self.coordinator.data.airIndex
     
     @property
     def attribution(self):
@@ -121,52 +136,53 @@ class EkoKartaZagrebAirQuality(AirQualityEntity):
     def extra_state_attributes(self):
         """Return the state attributes."""
         ret = {
-            ATTR_STATION: self.eko_karta_zagreb_data.get_data(SENSOR_TYPES["location"][4]),
-            ATTR_UPDATED: self.eko_karta_zagreb_data.last_update.isoformat(),
+            ATTR_STATION: self.coordinator.data.locationName,
+            ATTR_UPDATED: self.coordinator.data.measurementDate and self.coordinator.data.measurementDate.isoformat(),
+            **self.stale_attributes,
         }
         return(ret)
 
     @property
     def particulate_matter_2_5(self):
         """Return the particulate matter 2.5 level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_PM_2_5][4]))
+        return self.coordinator.data.pm25
 
     @property
     def particulate_matter_10(self):
         """Return the particulate matter 10 level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_PM_10][4]))
+        return self.coordinator.data.pm10
 
     @property
     def particulate_matter_0_1(self):
         """Return the particulate matter 0.1 level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_PM_0_1][4]))
+        return self.coordinator.data.pm1
 
     @property
     def air_quality_index(self):
         """Return the Air Quality Index (AQI)."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_AQI][4]))
+        return self.coordinator.data.airIndex
 
     @property
     def ozone(self):
         """Return the O3 (ozone) level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_OZONE][4]))
+        return self.coordinator.data.o3
 
     @property
     def carbon_monoxide(self):
         """Return the CO (carbon monoxide) level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_CO][4]))
+        return self.coordinator.data.co
 
     @property
     def sulphur_dioxide(self):
         """Return the SO2 (sulphur dioxide) level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_SO2][4]))
+        return self.coordinator.data.so2
 
     @property
     def nitrogen_monoxide(self):
         """Return the NO (nitrogen monoxide) level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_NO][4]))
+        return self.coordinator.data.no0
 
     @property
     def nitrogen_dioxide(self):
         """Return the NO2 (nitrogen dioxide) level."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_NO2][4]))
+        return self.coordinator.data.no2
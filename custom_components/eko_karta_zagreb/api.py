@@ -0,0 +1,538 @@
+"""Client of the Eko Karta Zagreb REST API."""
+import asyncio
+import codecs
+from contextlib import nullcontext
+import hashlib
+from http import HTTPStatus
+import json
+import logging
+import random
+import re
+import time
+
+import aiohttp
+from yarl import URL
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    EKOKARTAZAGREB_API_URL,
+    EKOKARTAZAGREB_STATIONS_API_URL,
+    REQUEST_HEADERS,
+    SNAPSHOT_API_PATH,
+    SNAPSHOT_STATIONS_API_PATH,
+    SNAPSHOT_VERSION,
+)
+from .aqi import european_aqi
+from .geo import htrs96_tm_to_wgs84
+from .models import EkoKartaZagrebMeasurement, _to_datetime, _to_float, changed_fields
+
+_LOGGER = logging.getLogger(__name__)
+
+# Latest data is small, a whole request over this long has hung
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
+# Streamed documents may take long in total, but not stall between reads
+STREAM_TIMEOUT = aiohttp.ClientTimeout(total=None, connect=10, sock_read=30)
+
+# Retries of a failed request, waiting RETRY_DELAY seconds doubling up to RETRY_DELAY_MAX
+FETCH_RETRIES = 2
+RETRY_DELAY = 2.0
+RETRY_DELAY_MAX = 10.0
+
+# Whitespace and commas between the elements of a streamed JSON array
+_SEPARATORS = re.compile(r"[ \t\r\n,]*")
+
+# Consecutive failed requests opening a host's circuit, and seconds it stays open
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 300.0
+
+
+class CircuitOpenError(aiohttp.ClientError):
+    """Request not sent, the upstream host's circuit is open."""
+
+
+class EkoKartaZagrebRequestLimiter:
+    """Stagger station fetches so many stations never burst against the upstream."""
+
+    def __init__(self, spacing, max_concurrent):
+        """Initialize the limiter."""
+        self._spacing = spacing
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._next_start = 0.0
+
+    async def __aenter__(self):
+        """Wait for a free slot and for this fetch's turn to start."""
+        await self._semaphore.acquire()
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_start)
+        self._next_start = start + self._spacing
+        if start > now:
+            try:
+                await asyncio.sleep(start - now)
+            except asyncio.CancelledError:
+                # __aexit__ doesn't run when __aenter__ raises, free the slot here
+                self._semaphore.release()
+                raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        """Release the slot."""
+        self._semaphore.release()
+
+
+class EkoKartaZagrebCircuitBreaker:
+    """Stop requesting a failing host for a while, then let one trial request through."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        """Initialize a closed breaker."""
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened = None
+        self._trial = False
+
+    @property
+    def closed(self):
+        """Return True if requests go through normally."""
+        return self._opened is None
+
+    def allow(self):
+        """Return True if a request may be sent now."""
+        if self._opened is None:
+            return True
+        if self._trial or time.monotonic() - self._opened < self._cooldown:
+            return False
+        # half open, one request decides whether the circuit closes again
+        self._trial = True
+        return True
+
+    def record_success(self):
+        """Close the circuit after a successful request."""
+        if self._opened is not None:
+            _LOGGER.info("Eko Karta Zagreb upstream recovered")
+        self._failures = 0
+        self._opened = None
+        self._trial = False
+
+    def cancel_trial(self):
+        """Let another trial request through, after one ended without an answer."""
+        self._trial = False
+
+    def record_failure(self):
+        """Count a failed request, opening the circuit after too many in a row."""
+        self._failures += 1
+        self._trial = False
+        if self._opened is not None or self._failures >= self._threshold:
+            if self._opened is None:
+                _LOGGER.warning(
+                    "Eko Karta Zagreb upstream failed %s times in a row, pausing requests for %.0f s",
+                    self._failures,
+                    self._cooldown,
+                )
+            self._opened = time.monotonic()
+
+
+class EkoKartaZagrebCircuitBreakers:
+    """Circuit breakers of upstream hosts."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        """Initialize the breakers."""
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._breakers = {}
+
+    def for_url(self, url):
+        """Return the breaker of url's host."""
+        host = URL(url).host
+        if host not in self._breakers:
+            self._breakers[host] = EkoKartaZagrebCircuitBreaker(self._threshold, self._cooldown)
+        return self._breakers[host]
+
+
+class EkoKartaZagrebData:
+    """The class for handling the data retrieval."""
+
+    EKOKARTAZAGREB_AIR_API_URL = EKOKARTAZAGREB_API_URL + "measurements/air/station/{}/latest?"
+    EKOKARTAZAGREB_AIRINDEX_API_URL = EKOKARTAZAGREB_API_URL + "measurements/air-index/station/{}/latest?"
+
+    _station_id = ""
+
+    def __init__(self, session, station_id, limiter=None, breakers=None, source=None):
+        """Initialize the probe, fetching from another instance's snapshots if source is set."""
+        self._session = session
+        self._station_id = station_id
+        self._source = source
+        self._limiter = limiter or nullcontext()
+        self._breakers = breakers or EkoKartaZagrebCircuitBreakers()
+        # since when the measurement is kept while the upstream fails, None when up to date
+        self.stale_since = None
+        # since when the air index endpoint fails, while the air measurements may still update
+        self.index_stale_since = None
+        # since when the source instance's own measurement is stale
+        self._source_stale_since = None
+        self.measurement = EkoKartaZagrebMeasurement()
+        # per endpoint ETag, Last-Modified and payload digest of the last fetch
+        self._validators = {}
+        # bumped whenever a changed measurement is swapped in, with the fields that changed
+        self.revision = 0
+        self.changed_fields = frozenset()
+        self.stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "unchanged": 0,
+            "retries": 0,
+            "failures": 0,
+            "index_failures": 0,
+            "skipped_writes": 0,
+            "index_checked": 0,
+            "index_mismatched": 0,
+        }
+        self.last_success = None
+        # the air index endpoint is only needed to check the locally computed indices
+        self.fetch_air_index = True
+        # timing and traffic metrics, collected only once enabled
+        self.metrics = None
+        _LOGGER.debug("Initialized sensor data: %s", station_id)
+
+    @property
+    def last_update(self):
+        """Return the timestamp of the most recent data."""
+        return self.measurement.measurementDate
+
+    def enable_metrics(self):
+        """Start collecting timing and traffic metrics."""
+        # Imported here, metrics are only collected on request
+        from .metrics import EkoKartaZagrebMetrics
+
+        if self.metrics is None:
+            self.metrics = EkoKartaZagrebMetrics()
+
+    def disable_metrics(self):
+        """Stop collecting timing and traffic metrics, dropping those collected."""
+        self.metrics = None
+
+    @property
+    def update_latency(self):
+        """Return the duration of the last update, in ms."""
+        if self.metrics is not None and self.metrics.update.last is not None:
+            return round(self.metrics.update.last, 1)
+
+    @property
+    def bytes_received(self):
+        """Return the total bytes received."""
+        if self.metrics is not None:
+            return self.metrics.bytes_received
+
+    def as_diagnostics(self):
+        """Return counters, metrics and state of the probe."""
+        return {
+            "revision": self.revision,
+            "stats": dict(self.stats),
+            "last_success": self.last_success and self.last_success.isoformat(),
+            "stale_since": self.stale_since and self.stale_since.isoformat(),
+            "index_stale_since": self.index_stale_since and self.index_stale_since.isoformat(),
+            "metrics": self.metrics and self.metrics.as_dict(),
+        }
+
+    async def async_current_air(self):
+        """Fetch and parse the latest data."""
+        _LOGGER.debug("Updating - started")
+        if self._source is not None:
+            # the published snapshot already has the air index merged in
+            (air,) = await asyncio.gather(self._async_fetch_snapshot(), return_exceptions=True)
+            air_index = None
+        elif self.fetch_air_index:
+            # air and air index endpoints are independent, fetch them concurrently
+            air, air_index = await asyncio.gather(
+                self._async_fetch_changed("air", self.EKOKARTAZAGREB_AIR_API_URL.format(self._station_id)),
+                self._async_fetch_changed("air_index", self.EKOKARTAZAGREB_AIRINDEX_API_URL.format(self._station_id)),
+                return_exceptions=True,
+            )
+        else:
+            (air,) = await asyncio.gather(
+                self._async_fetch_changed("air", self.EKOKARTAZAGREB_AIR_API_URL.format(self._station_id)),
+                return_exceptions=True,
+            )
+            air_index = None
+
+        # merge in fixed order, air sensor first and air index second, skipping unchanged payloads
+        measurement = self.measurement
+        air_succeeded = self._fetch_succeeded(air)
+        index_succeeded = self._fetch_succeeded(air_index)
+        # the measurement is fresh as long as the air fetch succeeds, indices are also computed locally
+        if air_succeeded:
+            # a published snapshot is as stale as the publisher's measurement
+            self.stale_since = self._source_stale_since
+            self.last_success = dt_util.utcnow()
+        elif self.stale_since is None:
+            self.stale_since = dt_util.utcnow()
+        if index_succeeded:
+            self.index_stale_since = None
+        else:
+            self.stats["index_failures"] += 1
+            if self.index_stale_since is None:
+                self.index_stale_since = dt_util.utcnow()
+
+        if air_succeeded and air is not None:
+            elems = air
+            # check if invalid meassurements of temperature, humidity and pressure - remove them from collection, so they dont get updated
+            invalid_weather = _to_float(elems.get("temperature")) == 0. and _to_float(elems.get("humidity")) == 0. and _to_float(elems.get("pressure")) == 0.
+            if invalid_weather and measurement.measurementDate is not None:
+                del elems["temperature"]
+                del elems["pressure"]
+                del elems["humidity"]
+            elif not invalid_weather and "measurementDate" in elems:
+                # the kept weather values are from this measurement, unless a published
+                # snapshot says they are held over from an older one
+                elems.setdefault("weatherDate", elems["measurementDate"])
+
+            measurement = measurement.merge(elems)
+            if self._source is None:
+                # indices of the new concentrations, until the air index endpoint catches up
+                measurement = measurement.merge(european_aqi([measurement])[0])
+
+        if index_succeeded and air_index is not None:
+            # a lagging air index endpoint still serves the previous measurement's indices,
+            # keep the local ones until it catches up
+            index_date = _to_datetime(air_index.pop("measurementDate", None))
+            if index_date is not None and index_date == measurement.measurementDate:
+                self._check_air_index(european_aqi([measurement])[0], air_index)
+                measurement = measurement.merge(air_index)
+            else:
+                _LOGGER.debug(
+                    "Station %s air index is of %s, not of %s, keeping the computed one",
+                    self._station_id,
+                    index_date,
+                    measurement.measurementDate,
+                )
+
+        # swap in the new snapshot at once
+        if measurement != self.measurement:
+            self.changed_fields = changed_fields(self.measurement, measurement)
+            self.measurement = measurement
+            self.revision += 1
+
+    async def _async_fetch_snapshot(self):
+        """Fetch the station's snapshot published by the source instance."""
+        elems = await self._async_fetch_changed(
+            "snapshot", self._source + SNAPSHOT_API_PATH.format(self._station_id)
+        )
+        if elems is None:
+            return None
+        if elems.pop("version", None) != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version of {self._source}")
+        stale_since = _to_datetime(elems.pop("staleSince", None))
+        self._source_stale_since = stale_since and dt_util.as_utc(stale_since)
+        return elems
+
+    async def _async_fetch_changed(self, endpoint, url):
+        """Fetch and decode url, returning None if it hasn't changed since the last fetch."""
+        breaker = self._breakers.for_url(url)
+        if not breaker.allow():
+            raise CircuitOpenError()
+        try:
+            ret = await self._async_fetch_retrying(endpoint, url)
+        except asyncio.CancelledError:
+            breaker.cancel_trial()
+            raise
+        except aiohttp.ClientResponseError as err:
+            self.stats["failures"] += 1
+            if err.status >= 500 or err.status == HTTPStatus.TOO_MANY_REQUESTS:
+                breaker.record_failure()
+            else:
+                # the host answers, only this station's resource is refused or missing
+                breaker.record_success()
+            raise
+        except Exception:
+            # also invalid payloads, e.g. a maintenance page while the upstream recovers
+            self.stats["failures"] += 1
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return ret
+
+    async def _async_fetch_retrying(self, endpoint, url):
+        """Fetch url, retrying timeouts, connection and server errors with exponential backoff."""
+        for attempt in range(FETCH_RETRIES + 1):
+            try:
+                return await self._async_fetch_once(endpoint, url)
+            except aiohttp.ClientResponseError as err:
+                if err.status < 500 and err.status != HTTPStatus.TOO_MANY_REQUESTS or attempt == FETCH_RETRIES:
+                    raise
+                _LOGGER.debug("Retrying %s, HTTP error: %s", url, err.status)
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as err:
+                if attempt == FETCH_RETRIES:
+                    raise
+                _LOGGER.debug("Retrying %s, error: %r", url, err)
+            self.stats["retries"] += 1
+            await asyncio.sleep(min(RETRY_DELAY * 2 ** attempt, RETRY_DELAY_MAX) * random.uniform(0.5, 1))
+
+    async def _async_fetch_once(self, endpoint, url):
+        """Fetch and decode url once."""
+        validators = self._validators.get(url, {})
+        headers = dict(REQUEST_HEADERS)
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        self.stats["requests"] += 1
+        async with self._session.get(url, headers=headers, timeout=REQUEST_TIMEOUT) as response:
+            if response.status == HTTPStatus.NOT_MODIFIED:
+                self.stats["not_modified"] += 1
+                if metrics is not None:
+                    metrics.observe_fetch(endpoint, time.perf_counter() - started, 0)
+                return None
+            response.raise_for_status()
+            payload = await response.read()
+        if metrics is not None:
+            metrics.observe_fetch(endpoint, time.perf_counter() - started, len(payload))
+
+        # servers without validators - skip parsing a payload identical to the last one
+        digest = hashlib.blake2b(payload, digest_size=16).digest()
+        if digest == validators.get("digest"):
+            self.stats["unchanged"] += 1
+            return None
+
+        if metrics is not None:
+            started = time.perf_counter()
+        elems = json.loads(payload)
+        if metrics is not None:
+            metrics.parse.observe(time.perf_counter() - started)
+        if not isinstance(elems, dict):
+            raise ValueError(f"Expecting JSON object, got {type(elems).__name__}")
+        self._validators[url] = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "digest": digest,
+        }
+        return elems
+
+    def _check_air_index(self, local, upstream):
+        """Count and log locally computed indices that differ from the upstream ones."""
+        for field, level in local.items():
+            expected = _to_float(upstream.get(field))
+            if expected is None:
+                continue
+            self.stats["index_checked"] += 1
+            if level != expected:
+                self.stats["index_mismatched"] += 1
+                _LOGGER.debug(
+                    "Station %s %s: computed %s, upstream %s", self._station_id, field, level, expected
+                )
+
+    @staticmethod
+    def _fetch_succeeded(result):
+        """Log a failed endpoint fetch, so it doesn't discard the other endpoint."""
+        if not isinstance(result, BaseException):
+            return True
+        if isinstance(result, CircuitOpenError):
+            _LOGGER.debug("Upstream circuit open, keeping the last measurement")
+        elif isinstance(result, aiohttp.ClientResponseError):
+            _LOGGER.error("HTTP error: %s", result.message )
+        elif isinstance(result, aiohttp.ClientError):
+            _LOGGER.error("URL error: %s", result )
+        elif isinstance(result, asyncio.TimeoutError):
+            _LOGGER.error("Timeout error")
+        elif isinstance(result, json.JSONDecodeError):
+            _LOGGER.error("JSON decoding error: %s", result.msg )
+        elif isinstance(result, ValueError):
+            _LOGGER.error("Invalid data: %s", result )
+        else:
+            raise result
+        return False
+
+    async def async_update(self):
+        """Get the latest data from Eko Karta Zagreb."""
+        _LOGGER.debug("Doing sensor data update, last_update was: %s", self.last_update)
+        async with self._limiter:
+            metrics = self.metrics
+            if metrics is None:
+                await self.async_current_air()
+            else:
+                started = time.perf_counter()
+                await self.async_current_air()
+                metrics.update.observe(time.perf_counter() - started)
+
+        _LOGGER.debug("Sensor, current data: %s", self.measurement)
+        _LOGGER.debug("Sensor, fetch stats: %s", self.stats)
+
+        _LOGGER.debug("Updating - finished.")
+
+    def get_data(self, variable):
+        """Get the data."""
+        return getattr(self.measurement, variable, None)
+
+
+async def async_iter_json_array(response, chunk_size=65536):
+    """Yield the objects of a top-level JSON array as they arrive, without holding the whole body."""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    async for chunk in response.content.iter_chunked(chunk_size):
+        buffer += text.decode(chunk)
+        pos = 0
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise json.JSONDecodeError("Expecting JSON array", buffer, pos)
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                elem, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                break  # incomplete object, wait for more data
+            if not isinstance(elem, (dict, list, str)) and buffer[end : end + 1] in ("", ".", "e", "E"):
+                break  # a number may continue in the next chunk
+            yield elem
+            pos = end
+        buffer = buffer[pos:]
+    raise json.JSONDecodeError("Unterminated JSON array", buffer, len(buffer))
+
+
+async def async_ekokartazagreb_stations(session):
+    """Return {CONF_STATION: (lat, lon, name)} for all stations, for auto-config."""
+    # stream the catalogue, keeping only the few fields of air stations
+    elems = []
+    async with session.get(
+        EKOKARTAZAGREB_STATIONS_API_URL, headers=REQUEST_HEADERS, timeout=STREAM_TIMEOUT
+    ) as response:
+        response.raise_for_status()
+        async for elem in async_iter_json_array(response):
+            if elem["measurementType"]["name"] == "zrak":
+                elems.append(
+                    {key: elem[key] for key in ("id", "name", "coordinateX", "coordinateY")}
+                )
+
+    # station coordinates are HTRS96/TM, convert the whole catalogue at once
+    coordinates = htrs96_tm_to_wgs84(
+        [float(elem["coordinateX"]) for elem in elems],
+        [float(elem["coordinateY"]) for elem in elems],
+    )
+    stations = {
+        str(elem["id"]): (lat, lon, elem["name"])
+        for elem, (lat, lon) in zip(elems, coordinates)
+    }
+    _LOGGER.debug("Loaded %s stations", len(stations))
+    return stations
+
+
+async def async_snapshot_stations(session, source):
+    """Return the station catalogue published by the source instance."""
+    async with session.get(
+        source + SNAPSHOT_STATIONS_API_PATH, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT
+    ) as response:
+        response.raise_for_status()
+        elems = await response.json()
+    if elems.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version of {source}")
+    return {station_id: tuple(station) for station_id, station in elems["stations"].items()}
@@ -0,0 +1,40 @@
+"""European Air Quality Index computed from measured concentrations."""
+from bisect import bisect_left
+
+# Upper bounds, in µg/m3, of the European Air Quality Index levels 1 (good) to 5
+# (very poor), anything above is level 6 (extremely poor)
+EAQI_BANDS = {
+    "pm25": (10, 20, 25, 50, 75),
+    "pm10": (20, 40, 50, 100, 150),
+    "no2": (40, 90, 120, 230, 340),
+    "o3": (50, 100, 130, 240, 380),
+    "so2": (100, 200, 350, 500, 750),
+}
+
+# Snapshot field of each pollutant's index
+INDEX_FIELDS = {pollutant: f"{pollutant}Index" for pollutant in EAQI_BANDS}
+
+
+def european_aqi(measurements):
+    """Return the index fields of each measurement snapshot, in one pass per pollutant.
+
+    Each pollutant's band lookup runs over the whole column of snapshots at
+    once; the overall airIndex is the worst level of any measured pollutant,
+    None if no pollutant was measured.
+    """
+    rows = [{} for _ in measurements]
+    worst = [0] * len(rows)
+    for pollutant, bands in EAQI_BANDS.items():
+        field = INDEX_FIELDS[pollutant]
+        column = [getattr(measurement, pollutant) for measurement in measurements]
+        for k, value in enumerate(column):
+            if value is None:
+                continue
+            level = bisect_left(bands, value) + 1
+            rows[k][field] = level
+            if level > worst[k]:
+                worst[k] = level
+    for row, level in zip(rows, worst):
+        if level:
+            row["airIndex"] = level
+    return rows
@@ -0,0 +1,193 @@
+"""Backfill of Eko Karta Zagreb measurement history into long-term statistics."""
+import asyncio
+from datetime import date, datetime, time, timedelta
+import json
+import logging
+
+import aiohttp
+import voluptuous as vol
+
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from . import DOMAIN
+from .api import STREAM_TIMEOUT, async_iter_json_array
+from .aqi import european_aqi
+from .const import CONF_STATION_ID, EKOKARTAZAGREB_API_URL, REQUEST_HEADERS
+from .coordinator import DATA_COORDINATORS, async_get_limiter
+from .history import HISTORY_FIELDS
+from .models import WEATHER_FIELDS, EkoKartaZagrebMeasurement
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_BACKFILL = "backfill"
+
+ATTR_START = "start"
+ATTR_END = "end"
+
+# Checkpoint entry of the first day not imported yet
+CHECKPOINT_NEXT = "next"
+
+EKOKARTAZAGREB_AIR_HISTORY_API_URL = EKOKARTAZAGREB_API_URL + "measurements/air/station/{}?from={}&to={}"
+
+STORAGE_KEY = f"{DOMAIN}.backfill"
+STORAGE_VERSION = 1
+
+# Days of hourly measurements requested, and imported, at once
+PAGE_DAYS = 7
+
+BACKFILL_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_STATION_ID): cv.string,
+        vol.Required(ATTR_START): cv.date,
+        vol.Optional(ATTR_END): cv.date,
+    }
+)
+
+
+def statistic_id(station_id, field):
+    """Return the external statistic ID of a station's field."""
+    return f"{DOMAIN}:station_{station_id}_{field.lower()}"
+
+
+class EkoKartaZagrebBackfill:
+    """Page through a station's measurement history and import it as statistics."""
+
+    def __init__(self, hass, store, checkpoints):
+        """Initialize the backfill."""
+        self.hass = hass
+        self._session = async_get_clientsession(hass)
+        self._limiter = async_get_limiter(hass)
+        self._store = store
+        self._checkpoints = checkpoints
+
+    async def async_run(self, station_id, start, end=None):
+        """Import hourly measurements of station_id between the start and end dates.
+
+        An interrupted backfill resumes from its checkpoint. Without an end, it
+        runs up to the day the backfill was first started.
+        """
+        key = f"{station_id}|{start.isoformat()}"
+        page_start = start
+        checkpoint = self._checkpoints.get(key)
+        if checkpoint is not None:
+            page_start = date.fromisoformat(checkpoint[CHECKPOINT_NEXT])
+            if end is None:
+                end = date.fromisoformat(checkpoint[ATTR_END])
+            _LOGGER.debug("Resuming backfill of station %s from %s", station_id, page_start)
+        elif end is None:
+            end = dt_util.now().date()
+
+        while page_start < end:
+            page_end = min(page_start + timedelta(days=PAGE_DAYS), end)
+            try:
+                imported = await self._async_import_page(station_id, page_start, page_end)
+            except aiohttp.ClientError as err:
+                _LOGGER.error("Backfill of station %s stopped at %s, URL error: %s", station_id, page_start, err)
+                return
+            except asyncio.TimeoutError:
+                _LOGGER.error("Backfill of station %s stopped at %s, timeout error", station_id, page_start)
+                return
+            except json.JSONDecodeError as err:
+                _LOGGER.error("Backfill of station %s stopped at %s, JSON decoding error: %s", station_id, page_start, err.msg)
+                return
+            _LOGGER.debug("Backfilled station %s, %s - %s: %s hours", station_id, page_start, page_end, imported)
+
+            page_start = page_end
+            self._checkpoints[key] = {ATTR_END: end.isoformat(), CHECKPOINT_NEXT: page_start.isoformat()}
+            await self._store.async_save(self._checkpoints)
+
+        self._checkpoints.pop(key, None)
+        await self._store.async_save(self._checkpoints)
+        _LOGGER.info("Backfill of station %s, %s - %s finished", station_id, start, end)
+
+    async def _async_import_page(self, station_id, page_start, page_end):
+        """Stream one page of measurements and import it in one batch per field."""
+        url = EKOKARTAZAGREB_AIR_HISTORY_API_URL.format(
+            station_id,
+            int(dt_util.as_timestamp(datetime.combine(page_start, time.min, dt_util.DEFAULT_TIME_ZONE)) * 1000),
+            int(dt_util.as_timestamp(datetime.combine(page_end, time.min, dt_util.DEFAULT_TIME_ZONE)) * 1000),
+        )
+        measurements = []
+        async with self._limiter:
+            async with self._session.get(url, headers=REQUEST_HEADERS, timeout=STREAM_TIMEOUT) as response:
+                response.raise_for_status()
+                async for elems in async_iter_json_array(response):
+                    measurements.append(EkoKartaZagrebMeasurement().merge(elems))
+
+        # history has no air index, compute the whole page's at once
+        rows = {field: {} for field in HISTORY_FIELDS}
+        for measurement, indices in zip(measurements, european_aqi(measurements)):
+            if measurement.airIndex is None:
+                measurement = measurement.merge(indices)
+            self._add_row(rows, measurement)
+
+        # Imported here, the recorder and sensor descriptions are only needed when backfilling
+        from homeassistant.components.recorder.statistics import async_add_external_statistics
+
+        from .sensor import SENSOR_TYPES
+
+        units = {
+            description.data_key: description.native_unit_of_measurement
+            for description in SENSOR_TYPES.values()
+        }
+        for field, statistics in rows.items():
+            if statistics:
+                async_add_external_statistics(
+                    self.hass,
+                    {
+                        "has_mean": True,
+                        "has_sum": False,
+                        "name": f"Eko Karta Zagreb {station_id} {field}",
+                        "source": DOMAIN,
+                        "statistic_id": statistic_id(station_id, field),
+                        "unit_of_measurement": units.get(field),
+                    },
+                    [statistics[start] for start in sorted(statistics)],
+                )
+        return max(len(statistics) for statistics in rows.values())
+
+    @staticmethod
+    def _add_row(rows, measurement):
+        """Add one upstream measurement to the page's hourly statistics."""
+        if measurement.measurementDate is None:
+            return
+        start = dt_util.as_utc(measurement.measurementDate).replace(minute=0, second=0, microsecond=0)
+        # same invalid temperature, humidity and pressure readings as the latest data
+        invalid_weather = measurement.temperature == measurement.humidity == measurement.pressure == 0.
+        for field in HISTORY_FIELDS:
+            value = getattr(measurement, field)
+            if value is None or (invalid_weather and field in WEATHER_FIELDS):
+                continue
+            rows[field][start] = {"start": start, "mean": value, "min": value, "max": value}
+
+
+async def async_setup_services(hass):
+    """Register the backfill service."""
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+    checkpoints = await store.async_load() or {}
+
+    async def async_backfill(call):
+        """Backfill the requested or all configured stations in the background."""
+        if "recorder" not in hass.config.components:
+            _LOGGER.error("Backfill needs the recorder integration")
+            return
+        start = call.data[ATTR_START]
+        end = call.data.get(ATTR_END)
+        if CONF_STATION_ID in call.data:
+            station_ids = [call.data[CONF_STATION_ID]]
+        else:
+            station_ids = list(hass.data.get(DOMAIN, {}).get(DATA_COORDINATORS, {}))
+
+        backfill = EkoKartaZagrebBackfill(hass, store, checkpoints)
+
+        async def async_backfill_stations():
+            """Backfill the stations one after another."""
+            for station_id in station_ids:
+                await backfill.async_run(station_id, start, end)
+
+        hass.async_create_task(async_backfill_stations())
+
+    hass.services.async_register(DOMAIN, SERVICE_BACKFILL, async_backfill, schema=BACKFILL_SCHEMA)
@@ -0,0 +1,102 @@
+"""Config flow for Eko Karta Zagreb."""
+import voluptuous as vol
+
+from homeassistant import config_entries
+from homeassistant.const import CONF_MONITORED_CONDITIONS, CONF_NAME
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
+
+from . import DOMAIN
+from .const import (
+    AIR_INDEX_LOCAL,
+    AIR_INDEX_UPSTREAM,
+    CONF_AIR_INDEX,
+    CONF_DIAGNOSTICS,
+    CONF_STATION_ID,
+    CONF_STATION_NAME,
+    DEFAULT_NAME,
+    DEFAULT_STATIONS_TTL,
+)
+from .sensor import SENSOR_TYPES
+from .stations import async_get_stations, closest_station
+
+
+class EkoKartaZagrebConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
+    """Set up one Eko Karta Zagreb station."""
+
+    VERSION = 1
+
+    async def async_step_user(self, user_input=None):
+        """Pick a station from the catalogue, the closest one by default."""
+        stations = await async_get_stations(self.hass, DEFAULT_STATIONS_TTL)
+        if not stations:
+            return self.async_abort(reason="cannot_connect")
+
+        if user_input is not None:
+            station_id = user_input[CONF_STATION_ID]
+            await self.async_set_unique_id(station_id)
+            self._abort_if_unique_id_configured()
+            station_name = stations[station_id][2]
+            return self.async_create_entry(
+                title=station_name,
+                data={
+                    CONF_STATION_ID: station_id,
+                    CONF_STATION_NAME: station_name,
+                    CONF_NAME: user_input.get(CONF_NAME) or f"{DEFAULT_NAME} {station_name}",
+                },
+            )
+
+        closest = closest_station(self.hass.config.latitude, self.hass.config.longitude, stations)
+        return self.async_show_form(
+            step_id="user",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_STATION_ID, default=closest): vol.In(
+                        {
+                            station_id: station[2]
+                            for station_id, station in sorted(stations.items(), key=lambda item: item[1][2])
+                        }
+                    ),
+                    vol.Optional(CONF_NAME): str,
+                }
+            ),
+        )
+
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow."""
+        return EkoKartaZagrebOptionsFlow()
+
+
+class EkoKartaZagrebOptionsFlow(config_entries.OptionsFlow):
+    """Choose the sensors of a station."""
+
+    async def async_step_init(self, user_input=None):
+        """Manage the sensors, air index source and diagnostics."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        # the flow's handler is its entry's ID
+        options = self.hass.config_entries.async_get_entry(self.handler).options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_MONITORED_CONDITIONS,
+                        default=options.get(CONF_MONITORED_CONDITIONS, list(SENSOR_TYPES)),
+                    ): cv.multi_select(
+                        {key: description.name for key, description in SENSOR_TYPES.items()}
+                    ),
+                    vol.Optional(
+                        CONF_AIR_INDEX, default=options.get(CONF_AIR_INDEX, AIR_INDEX_UPSTREAM)
+                    ): vol.In(
+                        {AIR_INDEX_UPSTREAM: "Air index endpoint", AIR_INDEX_LOCAL: "Computed locally"}
+                    ),
+                    vol.Optional(
+                        CONF_DIAGNOSTICS, default=options.get(CONF_DIAGNOSTICS, False)
+                    ): bool,
+                }
+            ),
+        )
@@ -0,0 +1,43 @@
+"""Constants of the Eko Karta Zagreb integration."""
+from datetime import timedelta
+import os
+
+ATTR_STATION = "station"
+ATTR_UPDATED = "updated"
+ATTR_STATIONS = "stations"
+ATTR_STALE = "stale"
+ATTR_STALE_SINCE = "stale_since"
+
+CONF_STATION_ID = "station_id"
+CONF_STATION_NAME = "station_name"
+CONF_STATIONS = "stations"
+CONF_STATIONS_TTL = "stations_ttl"
+CONF_INTERPOLATE = "interpolate"
+CONF_DIAGNOSTICS = "diagnostics"
+CONF_AIR_INDEX = "air_index"
+CONF_SOURCE = "source"
+CONF_PUBLISH = "publish"
+
+DEFAULT_NAME = "eko_karta_zagreb"
+
+STATIONS_ALL = "all"
+
+# Air quality indices fetched from the air index endpoint, or computed from the concentrations
+AIR_INDEX_UPSTREAM = "upstream"
+AIR_INDEX_LOCAL = "local"
+
+# Upstream REST API, overridable to run against a local stand-in of the service
+EKOKARTAZAGREB_API_URL = os.environ.get(
+    "EKOKARTAZAGREB_API_URL", "https://ekokartazagreb.stampar.hr/rest/"
+)
+EKOKARTAZAGREB_STATIONS_API_URL = EKOKARTAZAGREB_API_URL + "stations/"
+
+# Snapshots one instance publishes for others to consume instead of the upstream API
+SNAPSHOT_VERSION = 1
+SNAPSHOT_API_PATH = "/api/eko_karta_zagreb/snapshot/{}"
+SNAPSHOT_STATIONS_API_PATH = "/api/eko_karta_zagreb/stations"
+
+# aiohttp decompresses gzip and deflate responses transparently, also while streaming
+REQUEST_HEADERS = {"User-Agent": "Mozilla", "Accept-Encoding": "gzip, deflate"}
+
+DEFAULT_STATIONS_TTL = timedelta(days=7)
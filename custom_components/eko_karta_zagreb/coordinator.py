@@ -0,0 +1,283 @@
+"""Shared per-station data coordinator for Eko Karta Zagreb."""
+import asyncio
+from datetime import timedelta
+import logging
+import random
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+)
+
+from . import DOMAIN
+from .api import (
+    EkoKartaZagrebCircuitBreakers,
+    EkoKartaZagrebData,
+    EkoKartaZagrebRequestLimiter,
+)
+from .const import ATTR_STALE, ATTR_STALE_SINCE, CONF_SOURCE
+from .history import async_get_history_store
+from .models import MEASUREMENT_FIELDS
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_COORDINATORS = "coordinators"
+DATA_LIMITER = "limiter"
+DATA_BREAKERS = "breakers"
+
+# Spacing between, and maximum number of concurrent, station fetches
+REQUEST_SPACING = 1.0
+MAX_CONCURRENT_FETCHES = 2
+
+# Stations publish a new measurement every hour, some time after measurementDate
+MEASUREMENT_PERIOD = 3600.0
+DEFAULT_PUBLICATION_LAG = 600.0
+PUBLICATION_MARGIN = 30.0
+LAG_SMOOTHING = 0.3
+
+# Polling back-off while the expected measurement is late
+BACKOFF_MIN = 120.0
+BACKOFF_MAX = 1200.0
+BACKOFF_JITTER = 0.2
+
+
+class EkoKartaZagrebSchedule:
+    """Learn when a station publishes new data and poll right after it."""
+
+    def __init__(self):
+        """Initialize the schedule."""
+        # seconds between measurementDate and the data showing up upstream
+        self.lag = DEFAULT_PUBLICATION_LAG
+        self._measured = None
+        self._last_poll = None
+        self._late_polls = 0
+
+    def next_interval(self, measured, now):
+        """Return seconds until the next poll, given the latest measurementDate timestamp."""
+        last_poll, self._last_poll = self._last_poll, now
+        if measured is not None and measured != self._measured:
+            # new data showed up between the previous poll and now, learn from the midpoint
+            if (
+                self._measured is not None
+                and last_poll is not None
+                and now - last_poll < MEASUREMENT_PERIOD
+            ):
+                sample = (max(last_poll, measured) + now) / 2 - measured
+                self.lag += LAG_SMOOTHING * (sample - self.lag)
+            self._measured = measured
+            self._late_polls = 0
+
+        if measured is not None:
+            expected = measured + MEASUREMENT_PERIOD + self.lag
+            if now < expected:
+                return min(expected - now + PUBLICATION_MARGIN, MEASUREMENT_PERIOD)
+
+        # the next measurement is late, back off with jitter
+        delay = min(BACKOFF_MIN * 2 ** self._late_polls, BACKOFF_MAX)
+        self._late_polls += 1
+        return delay * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+
+class EkoKartaZagrebCoordinator(DataUpdateCoordinator):
+    """Fetch data for one station once per cycle, for every platform and entity."""
+
+    def __init__(self, hass, station_id, history_store):
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {station_id}",
+            update_interval=timedelta(seconds=BACKOFF_MIN),
+        )
+        self.station_id = station_id
+        self.probe = EkoKartaZagrebData(
+            async_get_clientsession(hass),
+            station_id=station_id,
+            limiter=async_get_limiter(hass),
+            breakers=async_get_breakers(hass),
+            source=hass.data[DOMAIN].get(CONF_SOURCE),
+        )
+        self.schedule = EkoKartaZagrebSchedule()
+        self.history = history_store.get(station_id)
+        self._history_store = history_store
+        self.first_refresh = None
+        # per platform setup, whether it needs the air index endpoint and metrics
+        self._consumers = {}
+        # an empty snapshot until the first refresh, so entities can be added before it
+        self.data = self.probe.measurement
+
+    @callback
+    def async_add_consumer(self, key, fetch_air_index=True, metrics=False):
+        """Apply what one platform setup needs from the probe, return a callback removing it.
+
+        The probe fetches the air index unless every consumer computes it
+        locally, and collects metrics while any consumer shows them.
+        """
+        self._consumers[key] = (fetch_air_index, metrics)
+        self._apply_consumers()
+
+        @callback
+        def remove_consumer():
+            self._consumers.pop(key, None)
+            self._apply_consumers()
+
+        return remove_consumer
+
+    def _apply_consumers(self):
+        """Configure the probe for all current consumers."""
+        consumers = self._consumers.values()
+        self.probe.fetch_air_index = not consumers or any(fetch for fetch, _ in consumers)
+        if any(metrics for _, metrics in consumers):
+            self.probe.enable_metrics()
+        else:
+            self.probe.disable_metrics()
+
+    async def _async_update_data(self):
+        """Update the shared probe and schedule the next poll."""
+        await self.probe.async_update()
+        if self.history.add(self.probe.measurement):
+            self._history_store.async_schedule_save()
+        last_update = self.probe.last_update
+        self.update_interval = timedelta(
+            seconds=self.schedule.next_interval(
+                last_update.timestamp() if last_update else None, time.time()
+            )
+        )
+        _LOGGER.debug(
+            "Station %s, publication lag: %.0f s, next poll in: %s",
+            self.station_id,
+            self.schedule.lag,
+            self.update_interval,
+        )
+        return self.probe.measurement
+
+
+class EkoKartaZagrebEntity(CoordinatorEntity):
+    """Coordinator entity that only writes state when the data it shows changed."""
+
+    # snapshot fields shown in the entity's state and attributes
+    watched_fields = MEASUREMENT_FIELDS
+
+    def __init__(self, coordinator, unique_id=None, station_name=None):
+        """Initialize the entity, with a unique ID and device if set up from a config entry."""
+        super().__init__(coordinator)
+        self._seen = None
+        self._revision = None
+        if unique_id is not None:
+            self._attr_unique_id = unique_id
+            self._attr_device_info = station_device_info(coordinator.station_id, station_name)
+
+    async def async_added_to_hass(self):
+        """Remember the revision of the state written when the entity is added."""
+        await super().async_added_to_hass()
+        self._revision = self.coordinator.probe.revision
+        self._seen = (self.coordinator.probe.stale_since, self.available)
+
+    def _handle_coordinator_update(self):
+        """Write state only if watched fields, staleness or availability changed."""
+        probe = self.coordinator.probe
+        seen = (probe.stale_since, self.available)
+        revision = probe.revision
+        # the snapshot diff covers a single revision, after missing one write anyway
+        unchanged = revision == self._revision or (
+            self._revision is not None
+            and revision == self._revision + 1
+            and self.watched_fields.isdisjoint(probe.changed_fields)
+        )
+        self._revision = revision
+        if unchanged and seen == self._seen:
+            probe.stats["skipped_writes"] += 1
+            return
+        self._seen = seen
+        metrics = probe.metrics
+        if metrics is None:
+            super()._handle_coordinator_update()
+        else:
+            started = time.perf_counter()
+            super()._handle_coordinator_update()
+            metrics.write.observe(time.perf_counter() - started)
+
+    @property
+    def available(self):
+        """Return True once the station's data was fetched successfully."""
+        return super().available and self.coordinator.probe.last_success is not None
+
+    @property
+    def stale_attributes(self):
+        """Return state attributes marking a measurement kept while the upstream fails."""
+        stale_since = self.coordinator.probe.stale_since
+        return {
+            ATTR_STALE: stale_since is not None,
+            ATTR_STALE_SINCE: stale_since and stale_since.isoformat(),
+        }
+
+
+def station_device_info(station_id, station_name):
+    """Return the device of a station's entities."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, station_id)},
+        name=station_name,
+        manufacturer="Eko Karta Zagreb",
+    )
+
+
+def async_get_limiter(hass):
+    """Return the request limiter shared by all stations."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_LIMITER not in domain_data:
+        domain_data[DATA_LIMITER] = EkoKartaZagrebRequestLimiter(
+            REQUEST_SPACING, MAX_CONCURRENT_FETCHES
+        )
+    return domain_data[DATA_LIMITER]
+
+
+def async_get_breakers(hass):
+    """Return the upstream circuit breakers shared by all stations."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_BREAKERS not in domain_data:
+        domain_data[DATA_BREAKERS] = EkoKartaZagrebCircuitBreakers()
+    return domain_data[DATA_BREAKERS]
+
+
+async def async_get_coordinator(hass, station_id, wait=True):
+    """Return the coordinator for station_id, creating and refreshing it on first use.
+
+    Unless wait is False, the first refresh is awaited.
+    """
+    history_store = await async_get_history_store(hass)
+    coordinators = hass.data.setdefault(DOMAIN, {}).setdefault(DATA_COORDINATORS, {})
+    coordinator = coordinators.get(station_id)
+    if coordinator is None:
+        _LOGGER.debug("Creating coordinator for station: %s", station_id)
+        coordinator = EkoKartaZagrebCoordinator(hass, station_id, history_store)
+        coordinator.first_refresh = hass.async_create_task(coordinator.async_refresh())
+        coordinators[station_id] = coordinator
+    if wait:
+        # Platforms set up concurrently all wait on the same first fetch
+        await asyncio.shield(coordinator.first_refresh)
+    return coordinator
+
+
+async def async_get_coordinators(hass, station_ids, wait=True):
+    """Return the coordinators of all station_ids that refreshed successfully.
+
+    If wait is False, the first refreshes aren't awaited and all coordinators
+    are returned.
+    """
+    coordinators = await asyncio.gather(
+        *(async_get_coordinator(hass, station_id, wait) for station_id in station_ids)
+    )
+    if not wait:
+        return coordinators
+    for coordinator in coordinators:
+        if not coordinator.last_update_success:
+            _LOGGER.error(
+                "Received error from Eko Karta Zagreb station %s: %s",
+                coordinator.station_id,
+                coordinator.last_exception,
+            )
+    return [coordinator for coordinator in coordinators if coordinator.last_update_success]
@@ -0,0 +1,17 @@
+"""Diagnostics support for Eko Karta Zagreb."""
+from . import DOMAIN
+from .coordinator import DATA_COORDINATORS
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return update counters, timings and schedule of every station."""
+    coordinators = hass.data.get(DOMAIN, {}).get(DATA_COORDINATORS, {})
+    return {
+        station_id: {
+            **coordinator.probe.as_diagnostics(),
+            "last_update_success": coordinator.last_update_success,
+            "update_interval": coordinator.update_interval and coordinator.update_interval.total_seconds(),
+            "publication_lag": round(coordinator.schedule.lag, 1),
+        }
+        for station_id, coordinator in coordinators.items()
+    }
@@ -0,0 +1,62 @@
+"""Short-term forecast of Eko Karta Zagreb measurements."""
+
+# Hours forecast ahead
+FORECAST_HOURS = 6
+
+# Snapshot fields forecast, with the lowest value they can take
+FORECAST_FIELDS = {
+    "temperature": None,
+    "pm25": 0.0,
+    "pm10": 0.0,
+    "no2": 0.0,
+}
+
+# Smoothing of the level and trend, and damping of the trend per hour
+ALPHA = 0.5
+BETA = 0.2
+PHI = 0.9
+
+
+def _damped_sum(hours):
+    """Return PHI + PHI**2 + ... + PHI**hours, the trend's total contribution over hours."""
+    return PHI * (1 - PHI ** hours) / (1 - PHI)
+
+
+class HoltForecaster:
+    """Damped trend exponential smoothing of an hourly series, updated in O(1) per sample."""
+
+    __slots__ = ("floor", "level", "trend", "last_time")
+
+    def __init__(self, floor=None):
+        """Initialize the forecaster without samples."""
+        self.floor = floor
+        self.level = None
+        self.trend = 0.0
+        self.last_time = None
+
+    def update(self, timestamp, value):
+        """Fold in the newest sample, spanning any gap since the previous one."""
+        if self.level is None:
+            self.level = value
+            self.last_time = timestamp
+            return
+        hours = round((timestamp - self.last_time) / 3600)
+        if hours < 1:
+            return
+        prior_level = self.level + _damped_sum(hours) * self.trend
+        level = ALPHA * value + (1 - ALPHA) * prior_level
+        self.trend = BETA * (level - self.level) / hours + (1 - BETA) * PHI ** hours * self.trend
+        self.level = level
+        self.last_time = timestamp
+
+    def forecast(self, hours=FORECAST_HOURS):
+        """Return the values forecast for each of the next hours after the newest sample."""
+        if self.level is None:
+            return []
+        ret = []
+        for hour in range(1, hours + 1):
+            value = self.level + _damped_sum(hour) * self.trend
+            if self.floor is not None:
+                value = max(value, self.floor)
+            ret.append(value)
+        return ret
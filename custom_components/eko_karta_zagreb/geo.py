@@ -0,0 +1,178 @@
+"""Geodesic distances and spatial index of Eko Karta Zagreb stations."""
+from heapq import heappush, heapreplace
+from math import asin, atan, cos, cosh, degrees, radians, sin, sinh, sqrt
+
+EARTH_RADIUS = 6371.0088  # km, mean radius
+
+# HTRS96/TM (EPSG:3765) - transverse Mercator on the GRS80 ellipsoid
+HTRS96_TM_SEMI_MAJOR_AXIS = 6378137.0
+HTRS96_TM_FLATTENING = 1 / 298.257222101
+HTRS96_TM_CENTRAL_MERIDIAN = 16.5
+HTRS96_TM_SCALE = 0.9999
+HTRS96_TM_FALSE_EASTING = 500000.0
+HTRS96_TM_FALSE_NORTHING = 0.0
+
+
+def _htrs96_tm_constants():
+    """Return the rectifying radius and Krüger series coefficients of HTRS96/TM."""
+    n = HTRS96_TM_FLATTENING / (2 - HTRS96_TM_FLATTENING)
+    n2, n3, n4 = n**2, n**3, n**4
+    radius = HTRS96_TM_SEMI_MAJOR_AXIS / (1 + n) * (1 + n2 / 4 + n4 / 64)
+    beta = (
+        n / 2 - 2 * n2 / 3 + 37 * n3 / 96 - n4 / 360,
+        n2 / 48 + n3 / 15 - 437 * n4 / 1440,
+        17 * n3 / 480 - 37 * n4 / 840,
+        4397 * n4 / 161280,
+    )
+    delta = (
+        2 * n - 2 * n2 / 3 - 2 * n3 + 116 * n4 / 45,
+        7 * n2 / 3 - 8 * n3 / 5 - 227 * n4 / 45,
+        56 * n3 / 15 - 136 * n4 / 35,
+        4279 * n4 / 630,
+    )
+    return HTRS96_TM_SCALE * radius, beta, delta
+
+
+_HTRS96_TM_RADIUS, _HTRS96_TM_BETA, _HTRS96_TM_DELTA = _htrs96_tm_constants()
+
+
+def htrs96_tm_to_wgs84(eastings, northings):
+    """Convert HTRS96/TM easting and northing sequences to [(lat, lon)] in degrees.
+
+    Inverse transverse Mercator by Krüger's series, accurate to well under
+    a millimetre in Croatia. HTRS96 is ETRS89 based, which matches WGS84 to
+    within a metre, far below what station selection needs.
+    """
+    radius = _HTRS96_TM_RADIUS
+    beta = tuple(enumerate(_HTRS96_TM_BETA, 1))
+    delta = tuple(enumerate(_HTRS96_TM_DELTA, 1))
+    ret = []
+    for easting, northing in zip(eastings, northings):
+        xi = (northing - HTRS96_TM_FALSE_NORTHING) / radius
+        eta = (easting - HTRS96_TM_FALSE_EASTING) / radius
+        xi_prime = xi - sum(b * sin(2 * j * xi) * cosh(2 * j * eta) for j, b in beta)
+        eta_prime = eta - sum(b * cos(2 * j * xi) * sinh(2 * j * eta) for j, b in beta)
+        chi = asin(sin(xi_prime) / cosh(eta_prime))
+        lat = chi + sum(d * sin(2 * j * chi) for j, d in delta)
+        lon = atan(sinh(eta_prime) / cos(xi_prime))
+        ret.append((degrees(lat), HTRS96_TM_CENTRAL_MERIDIAN + degrees(lon)))
+    return ret
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance between two points, in km."""
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def idw_weights(distances, power=2, min_distance=0.01):
+    """Return normalized inverse distance weights of distances in km."""
+    weights = [1 / max(distance, min_distance) ** power for distance in distances]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+def _unit_vector(lat, lon):
+    """Project a point to 3D coordinates on the unit sphere."""
+    lat, lon = radians(lat), radians(lon)
+    return (cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat))
+
+
+def _chord2(distance):
+    """Return the squared unit sphere chord of a great-circle distance in km."""
+    return (2 * sin(min(distance / EARTH_RADIUS, 3.14159) / 2)) ** 2
+
+
+class StationIndex:
+    """KD-tree of stations, for exact great-circle nearest neighbour and radius queries.
+
+    Stations are indexed by their position on the unit sphere, where the
+    straight line (chord) distance grows with the great-circle distance, so
+    the Euclidean KD-tree search gives exact haversine results.
+    """
+
+    __slots__ = ("_stations", "_ids", "_points", "_tree")
+
+    _cache = (None, None)
+
+    def __init__(self, stations):
+        """Build the index of {station_id: (lat, lon, name)} stations."""
+        self._stations = stations
+        self._ids = list(stations)
+        self._points = [_unit_vector(*stations[station_id][:2]) for station_id in self._ids]
+        self._tree = self._build(list(range(len(self._ids))), 0)
+
+    @classmethod
+    def for_stations(cls, stations):
+        """Return the index of stations, reusing it while the catalogue is unchanged."""
+        cached_stations, index = cls._cache
+        if cached_stations is not stations:
+            index = cls(stations)
+            cls._cache = (stations, index)
+        return index
+
+    def _build(self, indices, depth):
+        """Return a (point, axis, left, right) subtree of indices."""
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: self._points[i][axis])
+        mid = len(indices) // 2
+        return (
+            indices[mid],
+            axis,
+            self._build(indices[:mid], depth + 1),
+            self._build(indices[mid + 1 :], depth + 1),
+        )
+
+    def _search(self, lat, lon, k, max_chord2):
+        """Return up to k (chord2, point) nearest points within max_chord2, nearest first."""
+        target = _unit_vector(lat, lon)
+        best = []  # max-heap by negated distance
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            point = self._points[index]
+            chord2 = (
+                (target[0] - point[0]) ** 2
+                + (target[1] - point[1]) ** 2
+                + (target[2] - point[2]) ** 2
+            )
+            if chord2 <= max_chord2:
+                if len(best) < k:
+                    heappush(best, (-chord2, index))
+                elif chord2 < -best[0][0]:
+                    heapreplace(best, (-chord2, index))
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            bound = max_chord2 if len(best) < k else min(max_chord2, -best[0][0])
+            if diff * diff <= bound:
+                visit(far)
+
+        visit(self._tree)
+        return sorted((-chord2, index) for chord2, index in best)
+
+    def _result(self, lat, lon, found):
+        """Return [(station_id, km)] of found points."""
+        ret = []
+        for _, index in found:
+            station_id = self._ids[index]
+            station_lat, station_lon = self._stations[station_id][:2]
+            ret.append((station_id, haversine(lat, lon, station_lat, station_lon)))
+        return ret
+
+    def nearest(self, lat, lon, k=1):
+        """Return the k nearest [(station_id, km)], nearest first."""
+        return self._result(lat, lon, self._search(lat, lon, k, 4.0))
+
+    def within(self, lat, lon, radius):
+        """Return [(station_id, km)] of all stations within radius km, nearest first."""
+        return self._result(lat, lon, self._search(lat, lon, len(self._ids), _chord2(radius)))
+
+    def nearest_many(self, points, k=1):
+        """Return the k nearest [(station_id, km)] of each (lat, lon) point."""
+        return [self.nearest(lat, lon, k) for lat, lon in points]
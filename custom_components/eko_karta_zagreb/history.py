@@ -0,0 +1,248 @@
+"""Recent measurement history of Eko Karta Zagreb stations."""
+import asyncio
+from array import array
+import logging
+
+from homeassistant.helpers.storage import Store
+
+from . import DOMAIN
+from .forecast import FORECAST_FIELDS, FORECAST_HOURS, HoltForecaster
+from .models import WEATHER_FIELDS
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_HISTORY = "history"
+
+STORAGE_KEY = f"{DOMAIN}.history"
+STORAGE_VERSION = 1
+SAVE_DELAY = 60
+
+# Rolling windows, in hours, and the samples kept, one per hour of the longest
+HISTORY_WINDOWS = (3, 8, 24)
+HISTORY_SIZE = max(HISTORY_WINDOWS)
+
+# Snapshot fields kept in history
+HISTORY_FIELDS = (
+    "temperature",
+    "humidity",
+    "pressure",
+    "airIndex",
+    "co",
+    "no0",
+    "no2",
+    "o3",
+    "pm1",
+    "pm10",
+    "pm25",
+    "so2",
+)
+
+
+def _accumulate(sums, x, y, sign):
+    """Add (sign 1) or remove (sign -1) a sample from a window's sums of 1, x, x*x, y and x*y."""
+    sums[0] += sign
+    sums[1] += sign * x
+    sums[2] += sign * x * x
+    sums[3] += sign * y
+    sums[4] += sign * x * y
+
+
+class RollingSeries:
+    """Array-backed ring of hourly samples with O(1) rolling means and slopes.
+
+    Each window covers the samples of its last hours before the newest
+    sample, however many there are after an outage; samples leaving a
+    window are subtracted from its running sums as they age out.
+    """
+
+    __slots__ = ("_times", "_values", "_pushed", "_origin", "_starts", "_sums")
+
+    def __init__(self, size=HISTORY_SIZE):
+        """Initialize an empty series."""
+        self._times = array("d", bytes(8 * size))
+        self._values = array("d", bytes(8 * size))
+        # samples pushed so far, the position of the next one
+        self._pushed = 0
+        # timestamp the sample hours are counted from, moved up once per lap
+        self._origin = None
+        # per window position of its oldest sample, and sums over its samples
+        self._starts = dict.fromkeys(HISTORY_WINDOWS, 0)
+        self._sums = {window: [0.0] * 5 for window in HISTORY_WINDOWS}
+
+    def __len__(self):
+        """Return the number of samples."""
+        return min(self._pushed, len(self._values))
+
+    @property
+    def last_time(self):
+        """Return the timestamp of the newest sample."""
+        if self._pushed:
+            return self._times[(self._pushed - 1) % len(self._values)]
+
+    def _hours(self, position):
+        """Return the time and value of the sample at position, time in hours since the origin."""
+        slot = position % len(self._values)
+        return (self._times[slot] - self._origin) / 3600, self._values[slot]
+
+    def push(self, timestamp, value):
+        """Add the newest sample, updating every window incrementally."""
+        size = len(self._values)
+        if self._origin is None:
+            self._origin = timestamp
+        # the sample about to be overwritten leaves every window still holding it
+        for window, sums in self._sums.items():
+            if self._starts[window] <= self._pushed - size:
+                _accumulate(sums, *self._hours(self._starts[window]), -1)
+                self._starts[window] += 1
+
+        self._times[self._pushed % size] = timestamp
+        self._values[self._pushed % size] = value
+        self._pushed += 1
+        x = (timestamp - self._origin) / 3600
+        for window, sums in self._sums.items():
+            _accumulate(sums, x, value, 1)
+            # drop the samples older than the window's hours
+            oldest = timestamp - window * 3600
+            while self._times[self._starts[window] % size] <= oldest:
+                _accumulate(sums, *self._hours(self._starts[window]), -1)
+                self._starts[window] += 1
+
+        if self._pushed % size == 0:
+            # once per lap, recompute the running sums to drop accumulated rounding error
+            self._recompute()
+
+    def _recompute(self):
+        """Recompute the running sums from the stored samples, counting hours from the oldest."""
+        self._origin = self._times[(self._pushed - len(self)) % len(self._values)]
+        for window, sums in self._sums.items():
+            sums[:] = [0.0] * 5
+            for position in range(self._starts[window], self._pushed):
+                _accumulate(sums, *self._hours(position), 1)
+
+    def __iter__(self):
+        """Iterate (timestamp, value) samples, oldest first."""
+        size = len(self._values)
+        for k in range(self._pushed - len(self), self._pushed):
+            yield self._times[k % size], self._values[k % size]
+
+    def mean(self, window):
+        """Return the mean of the samples of the last window hours."""
+        count, _, _, sum_y, _ = self._sums[window]
+        if count:
+            return sum_y / count
+
+    def slope(self, window):
+        """Return the least squares trend of the samples of the last window hours, per hour."""
+        count, sum_x, sum_xx, sum_y, sum_xy = self._sums[window]
+        if count < 2:
+            return None
+        return (count * sum_xy - sum_x * sum_y) / (count * sum_xx - sum_x * sum_x)
+
+
+class EkoKartaZagrebHistory:
+    """Recent hourly history of one station, per measured field."""
+
+    def __init__(self, samples=None):
+        """Initialize the history, optionally from stored samples."""
+        self.series = {field: RollingSeries() for field in HISTORY_FIELDS}
+        self.forecasters = {field: HoltForecaster(floor) for field, floor in FORECAST_FIELDS.items()}
+        for field, field_samples in (samples or {}).items():
+            if field in self.series:
+                for timestamp, value in field_samples[-HISTORY_SIZE:]:
+                    self._push(field, timestamp, value)
+
+    def _push(self, field, timestamp, value):
+        """Add the newest sample of a field to its series and forecaster."""
+        self.series[field].push(timestamp, value)
+        if field in self.forecasters:
+            self.forecasters[field].update(timestamp, value)
+
+    def add(self, measurement):
+        """Add a measurement snapshot, if it is newer than the history. Return True if added."""
+        if measurement.measurementDate is None:
+            return False
+        timestamp = measurement.measurementDate.timestamp()
+        # weather values held over from an older measurement aren't a new sample
+        weather_timestamp = measurement.weatherDate and measurement.weatherDate.timestamp()
+        added = False
+        for field, series in self.series.items():
+            value = getattr(measurement, field)
+            sample_time = weather_timestamp if field in WEATHER_FIELDS else timestamp
+            last_time = series.last_time
+            if value is not None and sample_time is not None and (last_time is None or sample_time > last_time):
+                self._push(field, sample_time, value)
+                added = True
+        return added
+
+    def attributes(self, field):
+        """Return rolling averages and trends of a field as state attributes."""
+        series = self.series.get(field)
+        if not series:
+            return {}
+        ret = {}
+        for window in HISTORY_WINDOWS:
+            mean = series.mean(window)
+            slope = series.slope(window)
+            ret[f"Average {window}h"] = None if mean is None else round(mean, 2)
+            ret[f"Trend {window}h"] = None if slope is None else round(slope, 3)
+        return ret
+
+    def forecast(self, hours=FORECAST_HOURS):
+        """Return {timestamp: {field: value}} forecast for the next hours after the newest sample."""
+        ret = {}
+        for field, forecaster in self.forecasters.items():
+            for hour, value in enumerate(forecaster.forecast(hours), 1):
+                ret.setdefault(forecaster.last_time + hour * 3600, {})[field] = value
+        return ret
+
+    def as_dict(self):
+        """Return the samples for storage."""
+        return {
+            field: [[timestamp, value] for timestamp, value in series]
+            for field, series in self.series.items()
+            if len(series)
+        }
+
+
+class EkoKartaZagrebHistoryStore:
+    """Station histories, persisted in Home Assistant's storage directory."""
+
+    def __init__(self, hass):
+        """Initialize the store."""
+        self.histories = {}
+        self.load_task = None
+        self._stored = {}
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+
+    async def async_load(self):
+        """Load stored samples of all stations."""
+        self._stored = await self._store.async_load() or {}
+        _LOGGER.debug("Loaded history of %s stations", len(self._stored))
+
+    def get(self, station_id):
+        """Return the history of station_id, restored from storage on first use."""
+        if station_id not in self.histories:
+            self.histories[station_id] = EkoKartaZagrebHistory(self._stored.pop(station_id, None))
+        return self.histories[station_id]
+
+    def async_schedule_save(self):
+        """Save all histories after a delay, batching saves of many stations."""
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _data_to_save(self):
+        """Return the data to store, keeping stations not in use yet."""
+        return {
+            **self._stored,
+            **{station_id: history.as_dict() for station_id, history in self.histories.items()},
+        }
+
+
+async def async_get_history_store(hass):
+    """Return the history store, loaded once for all stations."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    history_store = domain_data.get(DATA_HISTORY)
+    if history_store is None:
+        history_store = domain_data[DATA_HISTORY] = EkoKartaZagrebHistoryStore(hass)
+        history_store.load_task = hass.async_create_task(history_store.async_load())
+    await asyncio.shield(history_store.load_task)
+    return history_store
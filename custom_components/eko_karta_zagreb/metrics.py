@@ -0,0 +1,90 @@
+"""Timing and traffic metrics of Eko Karta Zagreb updates."""
+from bisect import bisect_left
+
+# Upper bounds of histogram buckets, in milliseconds
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class LatencyHistogram:
+    """Bucketed histogram of durations, constant time and memory per sample."""
+
+    __slots__ = ("counts", "count", "total", "maximum", "last")
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.last = None
+
+    def observe(self, seconds):
+        """Add a duration in seconds."""
+        ms = seconds * 1000
+        self.counts[bisect_left(HISTOGRAM_BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.maximum = max(self.maximum, ms)
+        self.last = ms
+
+    def quantile(self, q):
+        """Return the bucket upper bound below which a q fraction of durations fall, in ms."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(HISTOGRAM_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.maximum
+
+    def as_dict(self):
+        """Return a summary of the histogram, in ms."""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 1) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.maximum, 1),
+            "last": self.last and round(self.last, 1),
+            "buckets": dict(zip([*map(str, HISTOGRAM_BUCKETS), "inf"], self.counts)),
+        }
+
+
+class EkoKartaZagrebMetrics:
+    """Per endpoint latency, parse time and bytes of one station's updates."""
+
+    def __init__(self):
+        """Initialize empty metrics."""
+        self.latency = {}
+        self.parse = LatencyHistogram()
+        self.update = LatencyHistogram()
+        self.write = LatencyHistogram()
+        self.bytes = {}
+
+    def observe_fetch(self, endpoint, seconds, size):
+        """Add one endpoint response's network time and size."""
+        if endpoint not in self.latency:
+            self.latency[endpoint] = LatencyHistogram()
+            self.bytes[endpoint] = 0
+        self.latency[endpoint].observe(seconds)
+        self.bytes[endpoint] += size
+
+    @property
+    def bytes_received(self):
+        """Return the total bytes received from all endpoints."""
+        return sum(self.bytes.values())
+
+    def as_dict(self):
+        """Return all metrics."""
+        return {
+            "latency": {
+                endpoint: histogram.as_dict()
+                for endpoint, histogram in self.latency.items()
+            },
+            "parse": self.parse.as_dict(),
+            "update": self.update.as_dict(),
+            "write": self.write.as_dict(),
+            "bytes": dict(self.bytes),
+        }
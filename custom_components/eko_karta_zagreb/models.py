@@ -0,0 +1,98 @@
+"""Measurement snapshot of an Eko Karta Zagreb station."""
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+
+from homeassistant.util import dt as dt_util
+
+WEATHER_FIELDS = ("temperature", "humidity", "pressure")
+
+
+def _to_float(value):
+    """Convert an API value to float, or None if it isn't numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_datetime(value):
+    """Convert an API millisecond timestamp to a local datetime, or None."""
+    try:
+        return dt_util.as_local(dt_util.utc_from_timestamp(float(value)/1000.))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class EkoKartaZagrebMeasurement:
+    """Immutable snapshot of a station's latest measurement, using the API's field names."""
+
+    measurementDate: datetime | None = None
+    # measurementDate of the last valid temperature, humidity and pressure readings
+    weatherDate: datetime | None = None
+    locationName: str | None = None
+    xCoordinate: float | None = None
+    yCoordinate: float | None = None
+    temperature: float | None = None
+    humidity: float | None = None
+    pressure: float | None = None
+    airIndex: float | None = None
+    co: float | None = None
+    coIndex: float | None = None
+    coAvg: float | None = None
+    no0: float | None = None
+    no0Avg: float | None = None
+    no2: float | None = None
+    no2Index: float | None = None
+    no2Avg: float | None = None
+    o3: float | None = None
+    o3Index: float | None = None
+    o3Avg: float | None = None
+    pm1: float | None = None
+    pm1Avg: float | None = None
+    pm10: float | None = None
+    pm10Index: float | None = None
+    pm10Avg: float | None = None
+    pm25: float | None = None
+    pm25Index: float | None = None
+    pm25Avg: float | None = None
+    so2: float | None = None
+    so2Index: float | None = None
+    so2Avg: float | None = None
+
+    def merge(self, elems):
+        """Return a new snapshot with the known fields of an API payload converted and applied."""
+        changes = {
+            key: MEASUREMENT_CONVERTERS[key](value)
+            for key, value in elems.items()
+            if key in MEASUREMENT_CONVERTERS
+        }
+        return replace(self, **changes)
+
+    def as_payload(self):
+        """Return the measured fields as an API payload, the inverse of merge."""
+        payload = {}
+        for field in fields(self):
+            value = getattr(self, field.name)
+            if value is None:
+                continue
+            if isinstance(value, datetime):
+                value = round(value.timestamp() * 1000)
+            payload[field.name] = value
+        return payload
+
+
+MEASUREMENT_FIELDS = frozenset(field.name for field in fields(EkoKartaZagrebMeasurement))
+
+
+def changed_fields(old, new):
+    """Return the names of the fields that differ between two snapshots."""
+    return frozenset(name for name in MEASUREMENT_FIELDS if getattr(old, name) != getattr(new, name))
+
+
+MEASUREMENT_CONVERTERS = {
+    **{field.name: _to_float for field in fields(EkoKartaZagrebMeasurement)},
+    "measurementDate": _to_datetime,
+    "weatherDate": _to_datetime,
+    "locationName": str,
+}
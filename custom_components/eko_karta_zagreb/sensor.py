@@ -1,77 +1,255 @@
 """Sensor for the Eko Karta Zagreb."""
-from datetime import timedelta, datetime
-import gzip
-import json
+from dataclasses import dataclass
+from datetime import timedelta
+from operator import attrgetter
 import logging
-import os
-from urllib.request import urlopen, Request, URLError, HTTPError
 import voluptuous as vol
 
-from homeassistant.components.weather import (
-    ATTR_WEATHER_HUMIDITY,
-    ATTR_WEATHER_PRESSURE,
-    ATTR_WEATHER_TEMPERATURE,
-)
-from homeassistant.components.air_quality import(
-    ATTR_AQI,
-    ATTR_CO,
-    ATTR_NO,
-    ATTR_NO2,
-    ATTR_OZONE,
-    ATTR_PM_0_1,
-    ATTR_PM_10,
-    ATTR_PM_2_5,
-    ATTR_SO2,
-)
+from homeassistant.components.sensor import SensorEntity, SensorEntityDescription
 from homeassistant.const import (
     CONF_NAME,
+    EntityCategory,
     CONF_LATITUDE,
     CONF_LONGITUDE,
     CONF_MONITORED_CONDITIONS,
-    __version__,
 )
 import homeassistant.helpers.config_validation as cv
-from homeassistant.helpers.entity import Entity
-from homeassistant.util import Throttle
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    AIR_INDEX_LOCAL,
+    AIR_INDEX_UPSTREAM,
+    ATTR_STALE_SINCE,
+    ATTR_STATION,
+    ATTR_STATIONS,
+    ATTR_UPDATED,
+    CONF_AIR_INDEX,
+    CONF_DIAGNOSTICS,
+    CONF_INTERPOLATE,
+    CONF_STATION_ID,
+    CONF_STATION_NAME,
+    CONF_STATIONS,
+    CONF_STATIONS_TTL,
+    DEFAULT_NAME,
+    DEFAULT_STATIONS_TTL,
+    STATIONS_ALL,
+)
+from .coordinator import (
+    EkoKartaZagrebEntity,
+    async_get_coordinator,
+    async_get_coordinators,
+    station_device_info,
+)
+from .geo import StationIndex, idw_weights
+from .history import HISTORY_FIELDS
+from .models import WEATHER_FIELDS
+from .stations import async_get_stations, resolve_station_ids, station_entity_name
 
 _LOGGER = logging.getLogger(__name__)
 
-ATTR_STATION = "station"
-ATTR_UPDATED = "updated"
-
-CONF_STATION_ID = "station_id"
+# Interpolated sensors ignore stations whose latest measurement is older
+INTERPOLATION_MAX_AGE = timedelta(hours=3)
+# and check that often for stations aging out, also when none updates
+INTERPOLATION_CHECK_INTERVAL = timedelta(minutes=5)
 
-DEFAULT_NAME = "eko_karta_zagreb"
+@dataclass(frozen=True, kw_only=True, slots=True)
+class EkoKartaZagrebSensorEntityDescription(SensorEntityDescription):
+    """Describes an Eko Karta Zagreb sensor and where its data is found."""
 
-MIN_TIME_BETWEEN_UPDATES = timedelta(minutes=20)
+    data_key: str
+    index_key: str | None = None
+    average_key: str | None = None
 
 SENSOR_TYPES = {
-    ATTR_WEATHER_TEMPERATURE: ("Temperature", "°C", "temperature", float, "temperature", "", "", "mdi:thermometer", "temperature", "measurement"),
-    ATTR_WEATHER_HUMIDITY: ("Humidity", "%", "humidity", int, "humidity", "", "", "mdi:water-percent", "humidity", "measurement"),
-    ATTR_WEATHER_PRESSURE: ("Pressure", "hPa", "pressure", float, "pressure", "", "", "mdi:thermometer-lines", "pressure", "measurement"),
-    ATTR_AQI: ("Air Quality index", "", "AQI", float, "airIndex", "", "", "mdi:air-filter", "aqi", "measurement"),
-    ATTR_CO: ("Carbon Monoxide (CO)", "mg/m3", "CO", float, "co", "coIndex", "coAvg","", "carbon_monoxide", "measurement"),
-    ATTR_NO: ("Nitrogen Monoxide (NO)", "µg/m3", "NO", float, "no0", "", "no0Avg","", "nitrogen_monoxide", "measurement"),
-    ATTR_NO2: ("Nitrogen Dioxide (NO₂)", "µg/m3", "NO₂", float, "no2", "no2Index", "no2Avg", "", "nitrogen_dioxide", "measurement"),
-    ATTR_OZONE: ("Ozone (O₃)", "µg/m3", "O₃", float, "o3", "o3Index", "o3Avg", "", "ozone", "measurement"),
-    ATTR_PM_0_1: ("Particles (<1)", "µg/m3", "PM1", float, "pm1", "", "pm1Avg", "", "pm1", "measurement"),
-    ATTR_PM_10: ("Particles (>10)", "µg/m3", "PM10", float, "pm10", "pm10Index", "pm10Avg", "", "pm10", "measurement"),
-    ATTR_PM_2_5: ("Particles (2-5)", "µg/m3", "PM2-5", float, "pm25", "pm25Index", "pm25Avg", "", "pm25", "measurement"),
-    ATTR_SO2: ("Sulphur Dioxide (SO₂)", "µg/m3", "SO₂", float, "so2", "so2Index", "so2Avg", "", "sulphur_dioxide", "measurement"),
+    "temperature": EkoKartaZagrebSensorEntityDescription(
+        key="temperature",
+        name="temperature",
+        native_unit_of_measurement="°C",
+        data_key="temperature",
+        icon="mdi:thermometer",
+        device_class="temperature",
+        state_class="measurement",
+    ),
+    "humidity": EkoKartaZagrebSensorEntityDescription(
+        key="humidity",
+        name="humidity",
+        native_unit_of_measurement="%",
+        data_key="humidity",
+        icon="mdi:water-percent",
+        device_class="humidity",
+        state_class="measurement",
+    ),
+    "pressure": EkoKartaZagrebSensorEntityDescription(
+        key="pressure",
+        name="pressure",
+        native_unit_of_measurement="hPa",
+        data_key="pressure",
+        icon="mdi:thermometer-lines",
+        device_class="pressure",
+        state_class="measurement",
+    ),
+    "air_quality_index": EkoKartaZagrebSensorEntityDescription(
+        key="air_quality_index",
+        name="AQI",
+        data_key="airIndex",
+        icon="mdi:air-filter",
+        device_class="aqi",
+        state_class="measurement",
+    ),
+    "carbon_monoxide": EkoKartaZagrebSensorEntityDescription(
+        key="carbon_monoxide",
+        name="CO",
+        native_unit_of_measurement="mg/m³",
+        data_key="co",
+        index_key="coIndex",
+        average_key="coAvg",
+        # the carbon_monoxide device class is in ppm
+        icon="mdi:molecule-co",
+        state_class="measurement",
+    ),
+    "nitrogen_monoxide": EkoKartaZagrebSensorEntityDescription(
+        key="nitrogen_monoxide",
+        name="NO",
+        native_unit_of_measurement="µg/m³",
+        data_key="no0",
+        average_key="no0Avg",
+        device_class="nitrogen_monoxide",
+        state_class="measurement",
+    ),
+    "nitrogen_dioxide": EkoKartaZagrebSensorEntityDescription(
+        key="nitrogen_dioxide",
+        name="NO₂",
+        native_unit_of_measurement="µg/m³",
+        data_key="no2",
+        index_key="no2Index",
+        average_key="no2Avg",
+        device_class="nitrogen_dioxide",
+        state_class="measurement",
+    ),
+    "ozone": EkoKartaZagrebSensorEntityDescription(
+        key="ozone",
+        name="O₃",
+        native_unit_of_measurement="µg/m³",
+        data_key="o3",
+        index_key="o3Index",
+        average_key="o3Avg",
+        device_class="ozone",
+        state_class="measurement",
+    ),
+    "particulate_matter_0_1": EkoKartaZagrebSensorEntityDescription(
+        key="particulate_matter_0_1",
+        name="PM1",
+        native_unit_of_measurement="µg/m³",
+        data_key="pm1",
+        average_key="pm1Avg",
+        device_class="pm1",
+        state_class="measurement",
+    ),
+    "particulate_matter_10": EkoKartaZagrebSensorEntityDescription(
+        key="particulate_matter_10",
+        name="PM10",
+        native_unit_of_measurement="µg/m³",
+        data_key="pm10",
+        index_key="pm10Index",
+        average_key="pm10Avg",
+        device_class="pm10",
+        state_class="measurement",
+    ),
+    "particulate_matter_2_5": EkoKartaZagrebSensorEntityDescription(
+        key="particulate_matter_2_5",
+        name="PM2-5",
+        native_unit_of_measurement="µg/m³",
+        data_key="pm25",
+        index_key="pm25Index",
+        average_key="pm25Avg",
+        device_class="pm25",
+        state_class="measurement",
+    ),
+    "sulphur_dioxide": EkoKartaZagrebSensorEntityDescription(
+        key="sulphur_dioxide",
+        name="SO₂",
+        native_unit_of_measurement="µg/m³",
+        data_key="so2",
+        index_key="so2Index",
+        average_key="so2Avg",
+        device_class="sulphur_dioxide",
+        state_class="measurement",
+    ),
     # general attributes
-    "location": ("Location", "", "", str, "locationName", "", "", "", "", ""),
-    "lon": ("Longitude", "°", "Long °", float, "xCoordinate", "","", "", "", ""),
-    "lat": ("Latitude", "°", "Latt °", float, "yCoordinate", "","", "", "", ""),
-    "update_timestamp": ("Update Timestamp", None, "Update", str, "measurementDate", "", "", "mdi:clock", "timestamp", ""),
+    "location": EkoKartaZagrebSensorEntityDescription(
+        key="location",
+        name="",
+        data_key="locationName",
+    ),
+    "lon": EkoKartaZagrebSensorEntityDescription(
+        key="lon",
+        name="Long °",
+        native_unit_of_measurement="°",
+        data_key="xCoordinate",
+    ),
+    "lat": EkoKartaZagrebSensorEntityDescription(
+        key="lat",
+        name="Latt °",
+        native_unit_of_measurement="°",
+        data_key="yCoordinate",
+    ),
+    "update_timestamp": EkoKartaZagrebSensorEntityDescription(
+        key="update_timestamp",
+        name="Update",
+        data_key="measurementDate",
+        icon="mdi:clock",
+        device_class="timestamp",
+    ),
 }
 
+DIAGNOSTIC_TYPES = (
+    EkoKartaZagrebSensorEntityDescription(
+        key="last_success",
+        name="last success",
+        data_key="last_success",
+        icon="mdi:cloud-check",
+        device_class="timestamp",
+    ),
+    EkoKartaZagrebSensorEntityDescription(
+        key="update_latency",
+        name="update latency",
+        native_unit_of_measurement="ms",
+        data_key="update_latency",
+        icon="mdi:timer-outline",
+        state_class="measurement",
+    ),
+    EkoKartaZagrebSensorEntityDescription(
+        key="bytes_received",
+        name="bytes received",
+        native_unit_of_measurement="B",
+        data_key="bytes_received",
+        icon="mdi:download-network",
+        device_class="data_size",
+        state_class="total_increasing",
+    ),
+)
+
 PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend(
     {
-        vol.Required(CONF_MONITORED_CONDITIONS, default=[ATTR_WEATHER_TEMPERATURE]): vol.All(
+        vol.Required(CONF_MONITORED_CONDITIONS, default=["temperature"]): vol.All(
             cv.ensure_list, [vol.In(SENSOR_TYPES)]
         ),        
-        vol.Optional(CONF_STATION_ID): cv.string,
+        vol.Exclusive(CONF_STATION_ID, "station"): cv.string,
+        vol.Exclusive(CONF_STATIONS, "station"): vol.Any(
+            STATIONS_ALL, vol.All(cv.ensure_list, [cv.string])
+        ),
+        vol.Exclusive(CONF_INTERPOLATE, "station"): vol.All(
+            vol.Coerce(int), vol.Range(min=2, max=10)
+        ),
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
+        vol.Optional(CONF_STATIONS_TTL, default=DEFAULT_STATIONS_TTL): cv.time_period,
+        vol.Optional(CONF_DIAGNOSTICS, default=False): cv.boolean,
+        vol.Optional(CONF_AIR_INDEX, default=AIR_INDEX_UPSTREAM): vol.In(
+            [AIR_INDEX_UPSTREAM, AIR_INDEX_LOCAL]
+        ),
         vol.Inclusive(
             CONF_LATITUDE, "coordinates", "Latitude and longitude must exist together"
         ): cv.latitude,
@@ -81,197 +259,288 @@ PLATFORM_SCHEMA = cv.PLATFORM_SCHEMA.extend(
     }
 )
 
-def setup_platform(hass, config, add_entities, discovery_info=None):
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the Eko Karta Zagreb sensor platform."""
-    name = config.get(CONF_NAME)
-    station_id = config.get(CONF_STATION_ID)
-    latitude = config.get(CONF_LATITUDE, hass.config.latitude)
-    longitude = config.get(CONF_LONGITUDE, hass.config.longitude)
-
-    stations = ekokartazagreb_stations()
+    stations = await async_get_stations(hass, config[CONF_STATIONS_TTL])
     _LOGGER.debug("Loaded stations dict: %s", stations)
-    station_id = config.get(CONF_STATION_ID) 
-    if station_id:
-        _LOGGER.debug("Configuration station_id: %s", station_id)
-        if station_id not in stations:
-            _LOGGER.error("Configuration %s: %s , is not known", CONF_STATION_ID, station_id)
-            return False            
-    else:
-        station_id = closest_station(latitude, longitude, stations)
-        _LOGGER.debug("Found closest station_id: %s", station_id)
-
-    station_name = stations[station_id][2]
-    _LOGGER.debug("Determined station name: %s", station_name)
-
-    probe = EkoKartaZagrebData(station_id=station_id)
-    try:
-        probe.update()
-    except (ValueError, TypeError) as err:
-        _LOGGER.error("Received error from Eko Karta Zagreb: %s", err)
+    if not stations:
+        _LOGGER.error("No Eko Karta Zagreb stations available")
         return False
 
-    add_entities(
-        [
-            EkoKartaZagrebSensor(probe, variable, name, station_name)
-            for variable in config[CONF_MONITORED_CONDITIONS]
-        ],
-        True,
-    )
-
+    if CONF_INTERPOLATE in config:
+        return await async_setup_interpolated(hass, config, async_add_entities, stations)
 
-class EkoKartaZagrebSensor(Entity):
-    """Implementation of a Eko Karta Zagreb sensor."""
-
-    def __init__(self, probe, variable, name, station_name):
-        """Initialize the sensor."""
-        self.probe = probe
-        self.client_name = name
-        self.variable = variable
-        self.station_name = station_name
+    station_ids = resolve_station_ids(hass, config, stations)
+    if not station_ids:
+        return False
 
-    @property
-    def name(self):
-        """Return the name of the sensor."""
-        return f"{self.client_name} {SENSOR_TYPES[self.variable][2]}"
+    # Many stations' first fetches, spaced by the limiter, could outlast Home Assistant's
+    # platform setup timeout. Their entities become available after the first refresh instead.
+    coordinators = await async_get_coordinators(hass, station_ids, wait=len(station_ids) == 1)
+    if not coordinators:
+        return False
 
-    @property
-    def state(self):
-        """Return the state of the sensor."""
-        return self.probe.get_data(SENSOR_TYPES[self.variable][4])
+    entities = [
+        EkoKartaZagrebSensor(
+            coordinator,
+            SENSOR_TYPES[variable],
+            station_entity_name(config, stations, coordinator.station_id),
+            stations[coordinator.station_id][2],
+        )
+        for coordinator in coordinators
+        for variable in config[CONF_MONITORED_CONDITIONS]
+    ]
+    # YAML platforms are never unloaded, their consumers stay for good
+    consumer = object()
+    for coordinator in coordinators:
+        coordinator.async_add_consumer(
+            consumer,
+            fetch_air_index=config[CONF_AIR_INDEX] == AIR_INDEX_UPSTREAM,
+            metrics=config[CONF_DIAGNOSTICS],
+        )
+    if config[CONF_DIAGNOSTICS]:
+        for coordinator in coordinators:
+            entities.extend(
+                EkoKartaZagrebDiagnosticSensor(
+                    coordinator,
+                    description,
+                    station_entity_name(config, stations, coordinator.station_id),
+                )
+                for description in DIAGNOSTIC_TYPES
+            )
+    async_add_entities(entities)
+
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the Eko Karta Zagreb sensors of a config entry."""
+    station_id = entry.data[CONF_STATION_ID]
+    name = entry.data[CONF_NAME]
+    station_name = entry.data[CONF_STATION_NAME]
+    # Added at once, the entities become available after the first refresh in the background
+    coordinator = await async_get_coordinator(hass, station_id, wait=False)
+    entities = [
+        EkoKartaZagrebSensor(
+            coordinator,
+            SENSOR_TYPES[variable],
+            name,
+            station_name,
+            unique_id=f"{station_id}_{variable}",
+        )
+        for variable in entry.options.get(CONF_MONITORED_CONDITIONS, list(SENSOR_TYPES))
+    ]
+    # withdrawn when the entry is unloaded, e.g. reloaded with changed options
+    entry.async_on_unload(
+        coordinator.async_add_consumer(
+            entry.entry_id,
+            fetch_air_index=entry.options.get(CONF_AIR_INDEX, AIR_INDEX_UPSTREAM) == AIR_INDEX_UPSTREAM,
+            metrics=entry.options.get(CONF_DIAGNOSTICS, False),
+        )
+    )
+    if entry.options.get(CONF_DIAGNOSTICS, False):
+        entities.extend(
+            EkoKartaZagrebDiagnosticSensor(
+                coordinator,
+                description,
+                name,
+                station_name,
+                unique_id=f"{station_id}_{description.key}",
+            )
+            for description in DIAGNOSTIC_TYPES
+        )
+    async_add_entities(entities)
+
+
+async def async_setup_interpolated(hass, config, async_add_entities, stations):
+    """Set up sensors interpolated from the nearest stations to a location."""
+    latitude = config.get(CONF_LATITUDE, hass.config.latitude)
+    longitude = config.get(CONF_LONGITUDE, hass.config.longitude)
+    nearest = StationIndex.for_stations(stations).nearest(latitude, longitude, config[CONF_INTERPOLATE])
+    _LOGGER.debug("Interpolating from stations: %s", nearest)
 
-    @property
-    def icon(self):
-        """Return the state of the sensor."""
-        return SENSOR_TYPES[self.variable][7]
+    coordinators = await async_get_coordinators(hass, [station_id for station_id, _ in nearest])
+    if not coordinators:
+        return False
+    distances = dict(nearest)
+    weights = idw_weights([distances[coordinator.station_id] for coordinator in coordinators])
+
+    entities = []
+    for variable in config[CONF_MONITORED_CONDITIONS]:
+        description = SENSOR_TYPES[variable]
+        if description.data_key not in HISTORY_FIELDS:
+            _LOGGER.warning("Can't interpolate %s, skipping it", variable)
+            continue
+        entities.append(
+            EkoKartaZagrebInterpolatedSensor(
+                list(zip(coordinators, weights)), description, config[CONF_NAME]
+            )
+        )
+    async_add_entities(entities)
+
+class EkoKartaZagrebSensor(EkoKartaZagrebEntity, SensorEntity):
+    """Implementation of a Eko Karta Zagreb sensor."""
 
-    @property
-    def device_class(self):
-        """Return the device_class of this entity, if any."""
-        return SENSOR_TYPES[self.variable][8]
+    entity_description: EkoKartaZagrebSensorEntityDescription
 
-    @property
-    def state_class(self):
-        """Return the state_class of this entity, if any."""
-        return SENSOR_TYPES[self.variable][9]
+    def __init__(self, coordinator, description, name, station_name, unique_id=None):
+        """Initialize the sensor."""
+        super().__init__(coordinator, unique_id, station_name)
+        self.entity_description = description
+        self.watched_fields = frozenset(
+            key
+            for key in (
+                description.data_key,
+                description.index_key,
+                description.average_key,
+                "locationName",
+                "measurementDate",
+            )
+            if key
+        )
+        self.station_name = station_name
+        self._attr_name = f"{name} {description.name}"
+        self._attr_icon = description.icon
+        self._attr_device_class = description.device_class
+        self._attr_native_unit_of_measurement = description.native_unit_of_measurement
+        self._attr_state_class = description.state_class
+        self._value = attrgetter(description.data_key)
 
     @property
-    def unit_of_measurement(self):
-        """Return the unit of measurement of this entity, if any."""
-        return SENSOR_TYPES[self.variable][1]
+    def native_value(self):
+        """Return the value of the sensor."""
+        return self._value(self.coordinator.data)
 
     @property
     def extra_state_attributes(self):
         """Return the state attributes."""
+        description = self.entity_description
+        data = self.coordinator.data
         ret = {
-            ATTR_STATION: self.probe.get_data(SENSOR_TYPES["location"][4]),
-            ATTR_UPDATED: self.probe.last_update.isoformat(),
+            ATTR_STATION: data.locationName,
+            ATTR_UPDATED: data.measurementDate and data.measurementDate.isoformat(),
+            **self.stale_attributes,
         }
-        if SENSOR_TYPES[self.variable][5]:
-            ret["Index"] = self.probe.get_data(SENSOR_TYPES[self.variable][5])
-        if SENSOR_TYPES[self.variable][6]:
-            ret["Average"] = self.probe.get_data(SENSOR_TYPES[self.variable][6])
+        if description.index_key:
+            ret["Index"] = getattr(data, description.index_key)
+        if description.average_key:
+            ret["Average"] = getattr(data, description.average_key)
+        if description.data_key in HISTORY_FIELDS:
+            ret.update(self.coordinator.history.attributes(description.data_key))
         return(ret)
 
-    def update(self):
-        """Delegate update to probe."""
-        self.probe.update()
-
-class EkoKartaZagrebData:
-    """The class for handling the data retrieval."""
-
-    EKOKARTAZAGREB_AIR_API_URL = "https://ekokartazagreb.stampar.hr/rest/measurements/air/station/{}/latest?"
-    EKOKARTAZAGREB_AIRINDEX_API_URL = "https://ekokartazagreb.stampar.hr/rest/measurements/air-index/station/{}/latest?"
-
-    _station_id = ""
-    _data = {}
+class EkoKartaZagrebInterpolatedSensor(SensorEntity):
+    """Sensor interpolated from the nearest stations by inverse distance weighting."""
+
+    entity_description: EkoKartaZagrebSensorEntityDescription
+
+    _attr_should_poll = False
+
+    def __init__(self, weighted_coordinators, description, name):
+        """Initialize the sensor with (coordinator, weight) pairs of its stations."""
+        self._weighted_coordinators = weighted_coordinators
+        self.entity_description = description
+        self._attr_name = f"{name} {description.name}"
+        self._attr_icon = description.icon
+        self._attr_device_class = description.device_class
+        self._attr_native_unit_of_measurement = description.native_unit_of_measurement
+        self._attr_state_class = description.state_class
+        self._seen_revisions = None
+        self._interpolate()
+
+    async def async_added_to_hass(self):
+        """Follow the updates of every station."""
+        await super().async_added_to_hass()
+        for coordinator, _ in self._weighted_coordinators:
+            self.async_on_remove(coordinator.async_add_listener(self._handle_coordinator_update))
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._async_check_age, INTERPOLATION_CHECK_INTERVAL)
+        )
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Interpolate again, once any station's measurement changed."""
+        revisions = tuple(coordinator.probe.revision for coordinator, _ in self._weighted_coordinators)
+        if revisions == self._seen_revisions:
+            return
+        self._seen_revisions = revisions
+        self._interpolate()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_check_age(self, now):
+        """Interpolate again, if stations aged out since the last update."""
+        previous = (self._attr_native_value, self._attr_extra_state_attributes)
+        self._interpolate()
+        if (self._attr_native_value, self._attr_extra_state_attributes) != previous:
+            self.async_write_ha_state()
+
+    def _interpolate(self):
+        """Combine the valid, recent values of all stations."""
+        key = self.entity_description.data_key
+        oldest = dt_util.now() - INTERPOLATION_MAX_AGE
+        total = weight_sum = 0.
+        used = []
+        for coordinator, weight in self._weighted_coordinators:
+            data = coordinator.data
+            if data is None or data.measurementDate is None or data.measurementDate < oldest:
+                continue
+            # invalid all-zero temperature, humidity and pressure readings are not merged,
+            # leave out stations still showing older weather values
+            if key in WEATHER_FIELDS and (data.weatherDate is None or data.weatherDate < data.measurementDate):
+                continue
+            value = getattr(data, key)
+            if value is None:
+                continue
+            total += weight * value
+            weight_sum += weight
+            used.append(data.locationName)
+
+        self._attr_native_value = round(total / weight_sum, 2) if weight_sum else None
+        self._attr_extra_state_attributes = {ATTR_STATIONS: used}
+
+class EkoKartaZagrebDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Diagnostic sensor of a station's update timing and traffic."""
+
+    entity_description: EkoKartaZagrebSensorEntityDescription
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, description, name, station_name=None, unique_id=None):
+        """Initialize the sensor."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        if unique_id is not None:
+            self._attr_unique_id = unique_id
+            self._attr_device_info = station_device_info(coordinator.station_id, station_name)
+        self._attr_name = f"{name} {description.name}"
+        self._attr_icon = description.icon
+        self._attr_device_class = description.device_class
+        self._attr_native_unit_of_measurement = description.native_unit_of_measurement
+        self._attr_state_class = description.state_class
+        self._value = attrgetter(description.data_key)
 
-    def __init__(self, station_id):
-        """Initialize the probe."""
-        self._station_id = station_id
-        self._data = {}
-        _LOGGER.debug("Initialized sensor data: %s", station_id)
+    @property
+    def native_value(self):
+        """Return the value of the sensor."""
+        return self._value(self.coordinator.probe)
 
     @property
-    def last_update(self):
-        """Return the timestamp of the most recent data."""
-        date_time = self._data.get("measurementDate")
-        if date_time is not None:
-            return datetime.fromtimestamp(float(date_time)/1000.)
-
-    def current_air(self):
-        """Fetch and parse the latest data."""
-        try:
-            _LOGGER.debug("Updating - started")
-            # check air sensor
-            url = self.EKOKARTAZAGREB_AIR_API_URL.format(self._station_id)
-            response = urlopen(Request(url, headers={'User-Agent': 'Mozilla'}))
-            elems = json.load(response)
-
-            # check if invalid meassurements of temperature, humidity and pressure - remove them from collection, so they dont get updated
-            if len(self._data) != 0 and float(elems["temperature"]) == 0. and float(elems["humidity"]) == 0. and float(elems["pressure"]) == 0. :
-                del elems["temperature"]
-                del elems["pressure"]
-                del elems["humidity"]
-
-            # update sensor data
-            self._data.update(elems)
-
-            # check air index sensor
-            url = self.EKOKARTAZAGREB_AIRINDEX_API_URL.format(self._station_id)
-            response = urlopen(Request(url, headers={'User-Agent': 'Mozilla'}))
-            elems = json.load(response)
-
-            # update sensor data
-            self._data.update(elems)
-
-        except HTTPError as err:
-            _LOGGER.error("HTTP error: %s", err.reason )
-        except URLError as err:
-            _LOGGER.error("URL error: %s", err.reason )
-        except json.JSONDecodeError as err:
-            _LOGGER.error("JSON decoding error: %s", err.msg )
-
-    @Throttle(MIN_TIME_BETWEEN_UPDATES)
-    def update(self):
-        """Get the latest data from Eko Karta Zagreb."""
-        if self.last_update and (
-            self.last_update + timedelta(hours=1)
-            > datetime.now()
-        ):
-            _LOGGER.debug("Skipping sensor data update, last_update was: %s", self.last_update)
-            return  # Not time to update yet; data is only hourly
-
-        _LOGGER.debug("Doing sensor data update, last_update was: %s", self.last_update)
-        self.current_air()
-
-        _LOGGER.debug("Sensor, current data: %s", self._data)
-
-        _LOGGER.debug("Updating - finished.")
-
-    def get_data(self, variable):
-        """Get the data."""
-        return self._data.get(variable)
-
-def ekokartazagreb_stations():
-    """Return {CONF_STATION: (lat, lon)} for all stations, for auto-config."""
-    stations = {}
-
-    js = json.load(urlopen(Request("https://ekokartazagreb.stampar.hr/rest/stations/", headers={'User-Agent': 'Mozilla'})))
-    for elem in js:
-        if elem["measurementType"]["name"] == "zrak":
-            stations[str(elem["id"])] = ( float(elem["coordinateY"])*0.00000909836-0.360421, float(elem["coordinateX"])*0.0000128768+10.0617, elem["name"] )
-    _LOGGER.debug("Loaded %s stations", len(stations))
-    return stations
-
-def closest_station(lat, lon, stations):
-    """Return the ID of the closest station to our lat/lon."""
-    _LOGGER.debug("Closest station, lat: %s, lon: %s", lat, lon)
-    if lat is None or lon is None:
-        return
-
-    def comparable_dist(stat_id):
-        """Calculate the pseudo-distance from lat/lon."""
-        station_lat, station_lon, _ = stations[stat_id]
-        return (lat - station_lat) ** 2 + (lon - station_lon) ** 2
-
-    return min(stations, key=comparable_dist)
+    def extra_state_attributes(self):
+        """Return the state attributes."""
+        probe = self.coordinator.probe
+        key = self.entity_description.key
+        if key == "update_latency":
+            metrics = probe.metrics.as_dict()
+            return {
+                f"{name} {stat}": value
+                for name, histogram in (
+                    *((f"fetch {endpoint}", latency) for endpoint, latency in metrics["latency"].items()),
+                    ("parse", metrics["parse"]),
+                    ("update", metrics["update"]),
+                    ("write", metrics["write"]),
+                )
+                for stat, value in histogram.items()
+                if stat in ("mean", "p95", "max")
+            }
+        if key == "bytes_received":
+            return {**probe.stats, **{f"bytes {endpoint}": size for endpoint, size in probe.metrics.bytes.items()}}
+        return {ATTR_STALE_SINCE: probe.stale_since and probe.stale_since.isoformat()}
@@ -0,0 +1,104 @@
+"""Publishing of Eko Karta Zagreb snapshots to other Home Assistant instances."""
+from http import HTTPStatus
+import hashlib
+import json
+import logging
+
+from aiohttp import web
+
+from homeassistant.components.http import HomeAssistantView
+
+from . import DOMAIN
+from .const import (
+    DEFAULT_STATIONS_TTL,
+    SNAPSHOT_API_PATH,
+    SNAPSHOT_STATIONS_API_PATH,
+    SNAPSHOT_VERSION,
+)
+from .coordinator import DATA_COORDINATORS
+from .stations import STATIONS_PROJECTION, async_get_stations
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _encode(document):
+    """Return a compact JSON body and its ETag."""
+    body = json.dumps(document, separators=(",", ":")).encode()
+    return body, '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _respond(request, body, etag):
+    """Return the body, or Not Modified if the client already has it."""
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=HTTPStatus.NOT_MODIFIED, headers={"ETag": etag})
+    return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+
+class EkoKartaZagrebSnapshotView(HomeAssistantView):
+    """Latest snapshot of a station, in the upstream API's payload format."""
+
+    url = SNAPSHOT_API_PATH.format("{station_id}")
+    name = f"api:{DOMAIN}:snapshot"
+    # the same public data as the upstream API
+    requires_auth = False
+
+    def __init__(self):
+        """Initialize the view."""
+        # per station revision and staleness, body and ETag of the last encoded snapshot
+        self._encoded = {}
+
+    async def get(self, request, station_id):
+        """Return the snapshot of a station this instance already polls."""
+        # unauthenticated clients mustn't make this instance poll more stations
+        coordinator = request.app["hass"].data.get(DOMAIN, {}).get(DATA_COORDINATORS, {}).get(station_id)
+        if coordinator is None:
+            return web.Response(status=HTTPStatus.NOT_FOUND)
+        probe = coordinator.probe
+        if probe.measurement.measurementDate is None:
+            return web.Response(status=HTTPStatus.SERVICE_UNAVAILABLE)
+
+        state = (probe.revision, probe.stale_since)
+        cached, body, etag = self._encoded.get(station_id, (None, None, None))
+        if cached != state:
+            stale_since = probe.stale_since and round(probe.stale_since.timestamp() * 1000)
+            body, etag = _encode(
+                {"version": SNAPSHOT_VERSION, "staleSince": stale_since, **probe.measurement.as_payload()}
+            )
+            self._encoded[station_id] = (state, body, etag)
+        return _respond(request, body, etag)
+
+
+class EkoKartaZagrebStationsView(HomeAssistantView):
+    """Cached station catalogue, with coordinates already converted."""
+
+    url = SNAPSHOT_STATIONS_API_PATH
+    name = f"api:{DOMAIN}:stations"
+    requires_auth = False
+
+    def __init__(self):
+        """Initialize the view."""
+        self._encoded = (None, None, None)
+
+    async def get(self, request):
+        """Return the station catalogue."""
+        stations = await async_get_stations(request.app["hass"], DEFAULT_STATIONS_TTL)
+        if not stations:
+            return web.Response(status=HTTPStatus.SERVICE_UNAVAILABLE)
+
+        cached, body, etag = self._encoded
+        if cached is not stations:
+            body, etag = _encode(
+                {"version": SNAPSHOT_VERSION, "projection": STATIONS_PROJECTION, "stations": stations}
+            )
+            self._encoded = (stations, body, etag)
+        return _respond(request, body, etag)
+
+
+def async_setup_publish(hass):
+    """Publish station snapshots and the catalogue over Home Assistant's HTTP server."""
+    if hass.http is None:
+        _LOGGER.error("Publishing snapshots needs the http integration")
+        return
+    hass.http.register_view(EkoKartaZagrebSnapshotView())
+    hass.http.register_view(EkoKartaZagrebStationsView())
+    _LOGGER.debug("Publishing snapshots at %s", SNAPSHOT_API_PATH.format("<station_id>"))
@@ -0,0 +1,163 @@
+"""Persistent cache of the Eko Karta Zagreb station catalogue."""
+import asyncio
+import json
+import logging
+
+import aiohttp
+
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, CONF_NAME
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from . import DOMAIN
+from .api import async_ekokartazagreb_stations, async_snapshot_stations
+from .const import CONF_SOURCE, CONF_STATION_ID, CONF_STATIONS, STATIONS_ALL
+from .geo import StationIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_STATIONS = "stations"
+
+STORAGE_KEY = f"{DOMAIN}.stations"
+STORAGE_VERSION = 1
+
+# Coordinate conversion the cached catalogue was made with
+STATIONS_PROJECTION = "htrs96_tm"
+
+
+class EkoKartaZagrebStations:
+    """Station catalogue kept in Home Assistant's storage directory."""
+
+    def __init__(self, hass, ttl):
+        """Initialize the catalogue."""
+        self.hass = hass
+        self.ttl = ttl
+        self.stations = {}
+        self.fetched = None
+        self.load_task = None
+        self._refresh_task = None
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+
+    @property
+    def expired(self):
+        """Return True if the catalogue is older than its TTL."""
+        return self.fetched is None or self.fetched + self.ttl < dt_util.utcnow()
+
+    async def async_load(self):
+        """Load the cached catalogue, downloading it only if nothing is cached yet."""
+        cached = await self._store.async_load()
+        if cached and cached.get("projection") != STATIONS_PROJECTION:
+            _LOGGER.debug("Cached stations use outdated coordinates, downloading again")
+            cached = None
+        if cached:
+            self.stations = {
+                station_id: tuple(station)
+                for station_id, station in cached["stations"].items()
+            }
+            self.fetched = dt_util.parse_datetime(cached["fetched"])
+            _LOGGER.debug("Loaded %s cached stations, fetched: %s", len(self.stations), self.fetched)
+
+        if not self.stations:
+            await self.async_refresh()
+
+    @property
+    def refreshing(self):
+        """Return True if a background refresh is in progress."""
+        return self._refresh_task is not None and not self._refresh_task.done()
+
+    def async_schedule_refresh(self):
+        """Refresh an expired catalogue in the background."""
+        if self.expired and not self.refreshing:
+            _LOGGER.debug("Station catalogue expired, refreshing in background")
+            self._refresh_task = self.hass.async_create_task(self.async_refresh())
+
+    async def async_refresh(self):
+        """Download the catalogue and save it to storage."""
+        session = async_get_clientsession(self.hass)
+        source = self.hass.data[DOMAIN].get(CONF_SOURCE)
+        try:
+            if source is not None:
+                stations = await async_snapshot_stations(session, source)
+            else:
+                stations = await async_ekokartazagreb_stations(session)
+        except aiohttp.ClientError as err:
+            _LOGGER.error("Station catalogue error: %s", err)
+            return
+        except asyncio.TimeoutError:
+            _LOGGER.error("Station catalogue error: timeout")
+            return
+        except json.JSONDecodeError as err:
+            _LOGGER.error("JSON decoding error: %s", err.msg)
+            return
+        except ValueError as err:
+            _LOGGER.error("Station catalogue error: %s", err)
+            return
+
+        self.stations = stations
+        self.fetched = dt_util.utcnow()
+        await self._store.async_save(
+            {
+                "fetched": self.fetched.isoformat(),
+                "projection": STATIONS_PROJECTION,
+                "stations": stations,
+            }
+        )
+
+
+async def async_get_stations(hass, ttl):
+    """Return the station catalogue, loaded once for all platforms."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    catalogue = domain_data.get(DATA_STATIONS)
+    if catalogue is None:
+        catalogue = domain_data[DATA_STATIONS] = EkoKartaZagrebStations(hass, ttl)
+        catalogue.load_task = hass.async_create_task(catalogue.async_load())
+    # Platforms set up concurrently all wait on the same load
+    await asyncio.shield(catalogue.load_task)
+    catalogue.async_schedule_refresh()
+    return catalogue.stations
+
+
+def resolve_station_ids(hass, config, stations):
+    """Return the IDs of all stations a platform configuration asks for."""
+    selected = config.get(CONF_STATIONS)
+    if selected == STATIONS_ALL:
+        _LOGGER.debug("Configuration %s: all %s stations", CONF_STATIONS, len(stations))
+        return list(stations)
+    if selected:
+        for station_id in selected:
+            if station_id not in stations:
+                _LOGGER.error("Configuration %s: %s , is not known", CONF_STATIONS, station_id)
+        return [station_id for station_id in selected if station_id in stations]
+
+    station_id = config.get(CONF_STATION_ID)
+    if station_id:
+        _LOGGER.debug("Configuration station_id: %s", station_id)
+        if station_id not in stations:
+            _LOGGER.error("Configuration %s: %s , is not known", CONF_STATION_ID, station_id)
+            return []
+    else:
+        latitude = config.get(CONF_LATITUDE, hass.config.latitude)
+        longitude = config.get(CONF_LONGITUDE, hass.config.longitude)
+        station_id = closest_station(latitude, longitude, stations)
+        _LOGGER.debug("Found closest station_id: %s", station_id)
+    return [station_id]
+
+
+def station_entity_name(config, stations, station_id):
+    """Return the entity name, suffixed with the station name in multi-station mode."""
+    name = config.get(CONF_NAME)
+    if CONF_STATIONS in config:
+        return f"{name} {stations[station_id][2]}"
+    return name
+
+
+def closest_station(lat, lon, stations):
+    """Return the ID of the closest station to our lat/lon."""
+    _LOGGER.debug("Closest station, lat: %s, lon: %s", lat, lon)
+    if lat is None or lon is None or not stations:
+        return
+
+    station_id, distance = StationIndex.for_stations(stations).nearest(lat, lon)[0]
+    _LOGGER.debug("Closest station: %s, %.2f km", station_id, distance)
+    return station_id
@@ -1,37 +1,45 @@
 """Sensor for data from Eko Karta Zagreb."""
+from datetime import datetime, timezone
 import logging
-from datetime import timedelta
 import voluptuous as vol
 
 from homeassistant.components.weather import (
-    ATTR_WEATHER_HUMIDITY,
-    ATTR_WEATHER_PRESSURE,
-    ATTR_WEATHER_TEMPERATURE,
     PLATFORM_SCHEMA,
     WeatherEntity,
+    WeatherEntityFeature,
 )
 from homeassistant.const import CONF_NAME, CONF_LONGITUDE, CONF_LATITUDE
 from homeassistant.const import UnitOfTemperature, UnitOfPressure
 from homeassistant.helpers import config_validation as cv
 
-# Reuse data and API logic from the sensor implementation
-from .sensor import (
+from .coordinator import (
+    EkoKartaZagrebEntity,
+    async_get_coordinator,
+    async_get_coordinators,
+)
+from .const import (
     DEFAULT_NAME,
     CONF_STATION_ID,
-    EkoKartaZagrebData,
-    SENSOR_TYPES,
+    CONF_STATION_NAME,
+    CONF_STATIONS,
+    CONF_STATIONS_TTL,
+    DEFAULT_STATIONS_TTL,
+    STATIONS_ALL,
     ATTR_STATION,
     ATTR_UPDATED,
-    closest_station,
-    ekokartazagreb_stations,
 )
+from .stations import async_get_stations, resolve_station_ids, station_entity_name
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     {
-        vol.Optional(CONF_STATION_ID): cv.string,
+        vol.Exclusive(CONF_STATION_ID, "station"): cv.string,
+        vol.Exclusive(CONF_STATIONS, "station"): vol.Any(
+            STATIONS_ALL, vol.All(cv.ensure_list, [cv.string])
+        ),
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
+        vol.Optional(CONF_STATIONS_TTL, default=DEFAULT_STATIONS_TTL): cv.time_period,
         vol.Inclusive(
             CONF_LATITUDE, "coordinates", "Latitude and longitude must exist together"
         ): cv.latitude,
@@ -41,76 +49,89 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     }
 )
 
-SCAN_INTERVAL = timedelta(minutes=20)
-
-def setup_platform(hass, config, add_entities, discovery_info=None):
+async def async_setup_platform(hass, config, async_add_entities, discovery_info=None):
     """Set up the Eko Karta Zagreb weather platform."""
-    name = config.get(CONF_NAME)
-    station_id = config.get(CONF_STATION_ID)
-    latitude = config.get(CONF_LATITUDE, hass.config.latitude)
-    longitude = config.get(CONF_LONGITUDE, hass.config.longitude)
-
-    stations = ekokartazagreb_stations()
+    stations = await async_get_stations(hass, config[CONF_STATIONS_TTL])
     _LOGGER.debug("Loaded stations dict: %s", stations)
-    station_id = config.get(CONF_STATION_ID) 
-    if station_id:
-        _LOGGER.debug("Configuration station_id: %s", station_id)
-        if station_id not in stations:
-            _LOGGER.error("Configuration %s: %s , is not known", CONF_STATION_ID, station_id)
-            return False            
-    else:
-        station_id = closest_station(latitude, longitude, stations)
-        _LOGGER.debug("Found closest station_id: %s", station_id)
-
-    station_name = stations[station_id][2]
-    _LOGGER.debug("Determined station name: %s", station_name)
-
-    probe = EkoKartaZagrebData(station_id=station_id)
-    try:
-        probe.update()
-    except (ValueError, TypeError) as err:
-        _LOGGER.error("Received error from Eko Karta Zagreb: %s", err)
+    if not stations:
+        _LOGGER.error("No Eko Karta Zagreb stations available")
         return False
 
-    add_entities([EkoKartaZagrebWeather(probe, name, station_name)], True)
+    station_ids = resolve_station_ids(hass, config, stations)
+    if not station_ids:
+        return False
+
+    # Many stations' first fetches, spaced by the limiter, could outlast Home Assistant's
+    # platform setup timeout. Their entities become available after the first refresh instead.
+    coordinators = await async_get_coordinators(hass, station_ids, wait=len(station_ids) == 1)
+    if not coordinators:
+        return False
 
-class EkoKartaZagrebWeather(WeatherEntity):
+    async_add_entities(
+        [
+            EkoKartaZagrebWeather(
+                coordinator,
+                station_entity_name(config, stations, coordinator.station_id),
+                stations[coordinator.station_id][2],
+            )
+            for coordinator in coordinators
+        ]
+    )
+
+async def async_setup_entry(hass, entry, async_add_entities):
+    """Set up the Eko Karta Zagreb weather entity of a config entry."""
+    station_id = entry.data[CONF_STATION_ID]
+    # Added at once, the entity becomes available after the first refresh in the background
+    coordinator = await async_get_coordinator(hass, station_id, wait=False)
+    async_add_entities(
+        [
+            EkoKartaZagrebWeather(
+                coordinator,
+                entry.data[CONF_NAME],
+                entry.data[CONF_STATION_NAME],
+                unique_id=station_id,
+            )
+        ]
+    )
+
+class EkoKartaZagrebWeather(EkoKartaZagrebEntity, WeatherEntity):
     """Representation of a weather condition."""
 
-    def __init__(self, eko_karta_zagreb_data, name, station_name):
-        """Initialise the platform with a data instance and station name."""
+    _attr_supported_features = WeatherEntityFeature.FORECAST_HOURLY
+
+    watched_fields = frozenset(
+        ("temperature", "pressure", "humidity", "locationName", "measurementDate")
+    )
+
+    def __init__(self, coordinator, name, station_name, unique_id=None):
+        """Initialise the platform with a shared coordinator and station name."""
+        super().__init__(coordinator, unique_id, station_name)
         _LOGGER.debug("Initialized.")
-        self.eko_karta_zagreb_data = eko_karta_zagreb_data
         self._name = name
-        self._state = self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_WEATHER_TEMPERATURE][4])
-        self._last_update = self.eko_karta_zagreb_data.last_update
+        self._last_update = self.coordinator.data.measurementDate
         self._station_name = station_name
 
-    def update(self):
-        """Update current conditions."""
+    def _handle_coordinator_update(self):
+        """Update current conditions from the shared coordinator."""
         _LOGGER.debug("Update - called.")
-        self.eko_karta_zagreb_data.update()
-        if self._last_update != self.eko_karta_zagreb_data.last_update:
+        if self._last_update != self.coordinator.data.measurementDate:
             _LOGGER.debug("Update - updated from last date found.")
-            self._last_update = self.eko_karta_zagreb_data.last_update
-            self._state = self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_WEATHER_TEMPERATURE][4])
+            self._last_update = self.coordinator.data.measurementDate
+            if self.hass is not None:
+                self.hass.async_create_task(self.async_update_listeners(("hourly",)))
         else:
             _LOGGER.debug("Update - no update found.")
+        super()._handle_coordinator_update()
     
     @property
     def name(self):
         """Return the name of the sensor."""
         return self._name
 
-    @property
-    def state(self):
-        """Return the state of the sensor."""
-        return self._state
-    
     @property
     def condition(self):
-        """Return the current condition."""
-        return self._state
+        """Return the current condition, which the stations don't measure."""
+        return None
 
     @property
     def attribution(self):
@@ -121,15 +142,32 @@ class EkoKartaZagrebWeather(WeatherEntity):
     def extra_state_attributes(self):
         """Return the state attributes."""
         ret = {
-            ATTR_STATION: self.eko_karta_zagreb_data.get_data(SENSOR_TYPES["location"][4]),
-            ATTR_UPDATED: self.eko_karta_zagreb_data.last_update.isoformat(),
+            ATTR_STATION: self.coordinator.data.locationName,
+            ATTR_UPDATED: self._last_update and self._last_update.isoformat(),
+            **self.stale_attributes,
         }
         return(ret)
 
+    async def async_forecast_hourly(self):
+        """Return the hourly forecast of temperature and pollutants after the latest measurement."""
+        forecast = self.coordinator.history.forecast()
+        return [
+            {
+                "datetime": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                "native_temperature": fields.get("temperature") and round(fields["temperature"], 1),
+                **{
+                    field: round(value, 1)
+                    for field, value in fields.items()
+                    if field != "temperature"
+                },
+            }
+            for timestamp, fields in sorted(forecast.items())
+        ]
+
     @property
-    def _attr_native_temperature(self):
+    def native_temperature(self):
         """Return the platform temperature."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_WEATHER_TEMPERATURE][4]))
+        return self.coordinator.data.temperature
 
     @property
     def _attr_native_temperature_unit(self):
@@ -137,9 +175,9 @@ class EkoKartaZagrebWeather(WeatherEntity):
         return UnitOfTemperature.CELSIUS
 
     @property
-    def _attr_native_pressure(self):
+    def native_pressure(self):
         """Return the pressure."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_WEATHER_PRESSURE][4]))
+        return self.coordinator.data.pressure
 
     @property
     def _attr_native_pressure_unit(self):
@@ -149,4 +187,4 @@ class EkoKartaZagrebWeather(WeatherEntity):
     @property
     def humidity(self):
         """Return the humidity."""
-        return float(self.eko_karta_zagreb_data.get_data(SENSOR_TYPES[ATTR_WEATHER_HUMIDITY][4]))
+        return self.coordinator.data.humidity
@@ -0,0 +1 @@
+"""Tests of the Eko Karta Zagreb integration."""
@@ -0,0 +1,77 @@
+"""Fixtures of the Eko Karta Zagreb tests."""
+import os
+import socket
+
+
+def _free_port():
+    """Return a TCP port that is free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# The integration reads its upstream URL on import, point it at the simulator first
+SIMULATOR_PORT = _free_port()
+os.environ["EKOKARTAZAGREB_API_URL"] = f"http://127.0.0.1:{SIMULATOR_PORT}/rest/"
+
+import pytest  # noqa: E402
+
+from homeassistant import config_entries, loader  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.helpers import (  # noqa: E402
+    area_registry,
+    device_registry,
+    entity,
+    entity_registry,
+    issue_registry,
+)
+from homeassistant.setup import async_setup_component  # noqa: E402
+
+from custom_components.eko_karta_zagreb import api, coordinator  # noqa: E402
+
+from .simulator import UpstreamSimulator  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def fast_fetches(monkeypatch):
+    """Drop the politeness delays between fetches and retries."""
+    monkeypatch.setattr(coordinator, "REQUEST_SPACING", 0.0)
+    monkeypatch.setattr(api, "RETRY_DELAY", 0.0)
+
+
+@pytest.fixture
+async def upstream():
+    """Serve the stand-in upstream API."""
+    simulator = UpstreamSimulator()
+    await simulator.start(port=SIMULATOR_PORT)
+    yield simulator
+    await simulator.close()
+
+
+async def async_start_hass(config_dir):
+    """Return a minimal Home Assistant instance able to load the integration."""
+    os.symlink(os.path.join(REPO_ROOT, "custom_components"), os.path.join(config_dir, "custom_components"))
+    hass = HomeAssistant(config_dir)
+    hass.config.skip_pip = True
+    hass.config.latitude, hass.config.longitude = 45.815, 15.982
+    hass.config.set_time_zone("Europe/Zagreb")
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await hass.config_entries.async_initialize()
+    entity.async_setup(hass)
+    await area_registry.async_load(hass)
+    await device_registry.async_load(hass)
+    await entity_registry.async_load(hass)
+    await issue_registry.async_load(hass)
+    assert await async_setup_component(hass, "homeassistant", {})
+    return hass
+
+
+@pytest.fixture
+async def hass(tmp_path):
+    """Run a Home Assistant instance for one test."""
+    hass = await async_start_hass(str(tmp_path))
+    yield hass
+    await hass.async_stop(force=True)
@@ -0,0 +1,169 @@
+"""Local stand-in for the Eko Karta Zagreb REST API."""
+import asyncio
+from collections import Counter
+import copy
+import json
+from pathlib import Path
+import random
+
+from aiohttp import web
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+WEATHER_FIELDS = ("temperature", "humidity", "pressure")
+
+# HTRS96/TM bounds of Zagreb, for synthetic stations
+ZAGREB_EASTINGS = (445000.0, 475000.0)
+ZAGREB_NORTHINGS = (5065000.0, 5085000.0)
+
+
+def load_fixture(name):
+    """Return a recorded payload from the fixtures directory."""
+    return json.loads((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+def synthetic_stations(count, first_id=10000, measurement_type="zrak", seed=0):
+    """Return count catalogue entries scattered over Zagreb."""
+    rng = random.Random(seed)
+    return [
+        {
+            "id": first_id + k,
+            "name": f"Synthetic {first_id + k}",
+            "coordinateX": round(rng.uniform(*ZAGREB_EASTINGS), 2),
+            "coordinateY": round(rng.uniform(*ZAGREB_NORTHINGS), 2),
+            "active": True,
+            "measurementType": {"id": 0, "name": measurement_type},
+        }
+        for k in range(count)
+    ]
+
+
+class UpstreamSimulator:
+    """Replay recorded payloads of the stations, latest and history endpoints.
+
+    Latency, HTTP errors, malformed bodies and all-zero weather readings
+    can be injected per endpoint, and every request is counted.
+    """
+
+    ENDPOINTS = ("stations", "air", "air_index", "history")
+
+    def __init__(self):
+        """Initialize the simulator with the recorded catalogue and measurements."""
+        self.stations = load_fixture("stations.json")
+        self.air = load_fixture("air_latest.json")
+        self.air_index = load_fixture("air_index_latest.json")
+        self.history = load_fixture("air_history.json")
+        self.latency = dict.fromkeys(self.ENDPOINTS, 0.0)
+        self.requests = Counter()
+        self.station_requests = Counter()
+        self.zero_readings = set()
+        # per station values replacing the recorded ones
+        self.overrides = {}
+        self._failures = {}
+        self._runner = None
+
+    def add_stations(self, stations):
+        """Extend the catalogue."""
+        self.stations.extend(stations)
+
+    @property
+    def air_station_ids(self):
+        """Return the IDs of all air stations in the catalogue, as strings."""
+        return [
+            str(station["id"])
+            for station in self.stations
+            if station["measurementType"]["name"] == "zrak"
+        ]
+
+    def set_latency(self, seconds, endpoint=None):
+        """Delay responses of one or all endpoints."""
+        for name in [endpoint] if endpoint else self.ENDPOINTS:
+            self.latency[name] = seconds
+
+    def fail(self, endpoint, status=500, times=None, after=0):
+        """Answer times (or all, if None) requests of endpoint with status, after the next after.
+
+        A status of "invalid" answers 200 with an HTML maintenance page.
+        """
+        self._failures[endpoint] = [status, times, after]
+
+    def recover(self, endpoint=None):
+        """Stop injecting errors into one or all endpoints."""
+        if endpoint is None:
+            self._failures.clear()
+        else:
+            self._failures.pop(endpoint, None)
+
+    def advance(self, hours=1):
+        """Publish the next measurement of every station."""
+        self.air["measurementDate"] += hours * 3600000
+        self.air_index["measurementDate"] += hours * 3600000
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Serve the API, return its base URL."""
+        app = web.Application()
+        app.router.add_get("/rest/stations/", self._stations)
+        app.router.add_get("/rest/measurements/air/station/{station_id}/latest", self._air)
+        app.router.add_get("/rest/measurements/air-index/station/{station_id}/latest", self._air_index)
+        app.router.add_get("/rest/measurements/air/station/{station_id}", self._history)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port, reuse_address=True)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}/rest/"
+
+    async def close(self):
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _respond(self, endpoint, request, payload):
+        """Count, delay and answer a request, injecting any configured failure."""
+        self.requests[endpoint] += 1
+        if "station_id" in request.match_info:
+            self.station_requests[request.match_info["station_id"]] += 1
+        if self.latency[endpoint]:
+            await asyncio.sleep(self.latency[endpoint])
+        failure = self._failures.get(endpoint)
+        if failure is not None and failure[2]:
+            failure[2] -= 1
+        elif failure is not None:
+            status, times, _ = failure
+            if times is not None:
+                failure[1] -= 1
+                if failure[1] <= 0:
+                    del self._failures[endpoint]
+            if status == "invalid":
+                return web.Response(text="<html>Maintenance</html>", content_type="text/html")
+            return web.Response(status=status)
+        return web.json_response(payload)
+
+    def _station_payload(self, station_id, payload):
+        """Return a copy of payload for station_id, zeroing weather if injected."""
+        payload = copy.copy(payload)
+        for station in self.stations:
+            if str(station["id"]) == station_id:
+                payload["locationName"] = station["name"]
+                break
+        payload.update(self.overrides.get(station_id, {}))
+        if station_id in self.zero_readings:
+            for field in WEATHER_FIELDS:
+                payload[field] = 0
+        return payload
+
+    async def _stations(self, request):
+        return await self._respond("stations", request, self.stations)
+
+    async def _air(self, request):
+        station_id = request.match_info["station_id"]
+        return await self._respond("air", request, self._station_payload(station_id, self.air))
+
+    async def _air_index(self, request):
+        return await self._respond("air_index", request, self.air_index)
+
+    async def _history(self, request):
+        start = int(request.query["from"])
+        end = int(request.query["to"])
+        rows = [row for row in self.history if start <= row["measurementDate"] < end]
+        return await self._respond("history", request, rows)
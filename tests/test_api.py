@@ -0,0 +1,236 @@
+"""Tests of the upstream client against the stand-in API."""
+import asyncio
+
+import aiohttp
+import pytest
+
+from custom_components.eko_karta_zagreb import api
+from custom_components.eko_karta_zagreb.api import (
+    EkoKartaZagrebCircuitBreakers,
+    EkoKartaZagrebData,
+    EkoKartaZagrebRequestLimiter,
+)
+
+
+@pytest.fixture
+async def session():
+    async with aiohttp.ClientSession() as session:
+        yield session
+
+
+async def test_update_merges_air_and_index(upstream, session):
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    measurement = probe.measurement
+    assert measurement.locationName == "Maksimir"
+    assert measurement.temperature == 21.4
+    assert measurement.pm10 == 18.2
+    assert measurement.airIndex == 2
+    assert measurement.coIndex == 1
+    assert measurement.measurementDate.timestamp() == upstream.air["measurementDate"] / 1000
+    assert probe.revision == 1
+    assert probe.stale_since is None
+    assert upstream.requests == {"air": 1, "air_index": 1}
+
+
+async def test_unchanged_payload_is_skipped(upstream, session):
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    await probe.async_update()
+    assert probe.revision == 1
+    assert probe.stats["unchanged"] == 2
+
+    upstream.advance()
+    await probe.async_update()
+    assert probe.revision == 2
+    assert probe.changed_fields == {"measurementDate", "weatherDate"}
+
+
+async def test_zero_weather_readings_keep_the_last_values(upstream, session):
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    upstream.zero_readings.add("969")
+    upstream.advance()
+    await probe.async_update()
+    assert probe.measurement.temperature == 21.4
+    assert probe.measurement.pm10 == 18.2
+    assert probe.measurement.weatherDate < probe.measurement.measurementDate
+
+
+async def test_server_errors_are_retried(upstream, session):
+    upstream.fail("air", 503, times=2)
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    assert probe.stats["retries"] == 2
+    assert probe.measurement.temperature == 21.4
+    assert upstream.requests["air"] == 3
+
+
+async def test_client_errors_are_not_retried(upstream, session):
+    upstream.fail("air", 404)
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    assert probe.stats["retries"] == 0
+    assert upstream.requests["air"] == 1
+
+
+async def test_timeout_keeps_last_snapshot_and_marks_it_stale(upstream, session, monkeypatch):
+    monkeypatch.setattr(api, "REQUEST_TIMEOUT", aiohttp.ClientTimeout(total=0.05))
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    upstream.set_latency(0.2)
+    upstream.advance()
+    await probe.async_update()
+    assert probe.stale_since is not None
+    assert probe.measurement.temperature == 21.4
+    assert probe.stats["failures"] == 2
+
+    upstream.set_latency(0.0)
+    await probe.async_update()
+    assert probe.stale_since is None
+    assert probe.revision == 2
+
+
+async def test_circuit_opens_after_repeated_failures(upstream, session):
+    upstream.fail("air", 500)
+    upstream.fail("air_index", 500)
+    breakers = EkoKartaZagrebCircuitBreakers()
+    probe = EkoKartaZagrebData(session, "969", breakers=breakers)
+    for _ in range(api.BREAKER_THRESHOLD):
+        await probe.async_update()
+    sent = sum(upstream.requests.values())
+    assert not breakers.for_url(probe.EKOKARTAZAGREB_AIR_API_URL).closed
+
+    await probe.async_update()
+    assert sum(upstream.requests.values()) == sent
+
+
+async def test_missing_station_resources_dont_open_the_circuit(upstream, session):
+    """Stations the upstream answers 404 for don't stop the other stations of the same host."""
+    upstream.fail("air", 404, times=2)
+    upstream.fail("air_index", 404, times=2)
+    breakers = EkoKartaZagrebCircuitBreakers(threshold=2)
+    missing = [EkoKartaZagrebData(session, station_id, breakers=breakers) for station_id in ("501", "612")]
+    for probe in missing:
+        await probe.async_update()
+    assert breakers.for_url(missing[0].EKOKARTAZAGREB_AIR_API_URL).closed
+    assert missing[0].stats["failures"] == 2
+
+    probe = EkoKartaZagrebData(session, "969", breakers=breakers)
+    await probe.async_update()
+    assert probe.measurement.temperature == 21.4
+
+
+@pytest.mark.parametrize("status", ["invalid", 500])
+async def test_failed_trial_reopens_circuit_until_recovery(upstream, session, status):
+    """A trial request failing in any way settles the half-open breaker."""
+    breakers = EkoKartaZagrebCircuitBreakers(threshold=1, cooldown=0.0)
+    probe = EkoKartaZagrebData(session, "969", breakers=breakers)
+    upstream.fail("air", 500)
+    upstream.fail("air_index", 500)
+    await probe.async_update()
+    breaker = breakers.for_url(probe.EKOKARTAZAGREB_AIR_API_URL)
+    assert not breaker.closed
+
+    # the upstream answers the trial with a maintenance page or an error
+    upstream.fail("air", status)
+    upstream.fail("air_index", status)
+    await probe.async_update()
+    assert not breaker.closed
+
+    upstream.recover()
+    upstream.requests.clear()
+    await probe.async_update()
+    assert upstream.requests["air"] == 1
+    assert breaker.closed
+    assert probe.stale_since is None
+    assert probe.measurement.temperature == 21.4
+
+
+async def test_cancelled_trial_lets_the_next_one_through(upstream, session):
+    breakers = EkoKartaZagrebCircuitBreakers(threshold=1, cooldown=0.0)
+    probe = EkoKartaZagrebData(session, "969", breakers=breakers)
+    upstream.fail("air", 500)
+    upstream.fail("air_index", 500)
+    await probe.async_update()
+
+    upstream.recover()
+    upstream.set_latency(1.0)
+    task = asyncio.ensure_future(probe.async_update())
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    upstream.set_latency(0.0)
+    await probe.async_update()
+    assert breakers.for_url(probe.EKOKARTAZAGREB_AIR_API_URL).closed
+    assert probe.measurement.temperature == 21.4
+
+
+async def test_failing_index_endpoint_keeps_air_fresh(upstream, session):
+    """A station without indices still updates, with the indices computed locally."""
+    upstream.fail("air_index", 404)
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    assert probe.last_success is not None
+    assert probe.stale_since is None
+    assert probe.index_stale_since is not None
+    assert probe.stats["index_failures"] == 1
+    assert probe.measurement.temperature == 21.4
+    assert probe.measurement.pm25Index == 2
+
+    upstream.recover()
+    await probe.async_update()
+    assert probe.index_stale_since is None
+    assert probe.measurement.coIndex == 1
+
+
+async def test_limiter_frees_the_slot_of_a_cancelled_wait():
+    """A fetch cancelled while waiting for its turn doesn't keep its slot."""
+    limiter = EkoKartaZagrebRequestLimiter(spacing=10.0, max_concurrent=1)
+
+    async def fetch():
+        async with limiter:
+            pass
+
+    await fetch()
+    task = asyncio.ensure_future(fetch())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    limiter._spacing = limiter._next_start = 0.0
+    await asyncio.wait_for(fetch(), 1.0)
+
+
+async def test_lagging_air_index_keeps_the_computed_one(upstream, session):
+    """Upstream indices of the previous hour neither roll back nor replace the current ones."""
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    checked = probe.stats["index_checked"]
+
+    upstream.advance()
+    upstream.air["pm25"] = 60.0
+    upstream.air_index["measurementDate"] -= 3600000
+    await probe.async_update()
+    assert probe.measurement.measurementDate.timestamp() == upstream.air["measurementDate"] / 1000
+    assert probe.measurement.pm25Index == 5
+    assert probe.measurement.airIndex == 5
+    assert probe.stats["index_checked"] == checked
+
+    upstream.air_index.update(measurementDate=upstream.air["measurementDate"], pm25Index=5, airIndex=5)
+    await probe.async_update()
+    assert probe.measurement.airIndex == 5
+    assert probe.stats["index_checked"] > checked
+    assert probe.stats["index_mismatched"] == 0
+
+
+async def test_computed_indices_are_checked_against_upstream(upstream, session):
+    upstream.air_index["pm25Index"] = 3
+    probe = EkoKartaZagrebData(session, "969")
+    await probe.async_update()
+    assert probe.stats["index_mismatched"] == 1
+    # the upstream index wins
+    assert probe.measurement.pm25Index == 3
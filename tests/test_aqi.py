@@ -0,0 +1,43 @@
+"""Tests of the locally computed European Air Quality Index."""
+import pytest
+
+from custom_components.eko_karta_zagreb.aqi import EAQI_BANDS, european_aqi
+from custom_components.eko_karta_zagreb.models import EkoKartaZagrebMeasurement
+
+
+@pytest.mark.parametrize(
+    ("pm25", "level"),
+    [(0.0, 1), (10.0, 1), (10.1, 2), (20.0, 2), (25.0, 3), (50.0, 4), (75.0, 5), (75.1, 6), (800.0, 6)],
+)
+def test_band_upper_bounds_are_inclusive(pm25, level):
+    (row,) = european_aqi([EkoKartaZagrebMeasurement(pm25=pm25)])
+    assert row == {"pm25Index": level, "airIndex": level}
+
+
+def test_air_index_is_the_worst_pollutant():
+    rows = european_aqi(
+        [
+            EkoKartaZagrebMeasurement(pm25=11.3, pm10=18.2, no2=27.5, o3=84.0, so2=3.4),
+            EkoKartaZagrebMeasurement(pm10=18.2, no2=250.0),
+            EkoKartaZagrebMeasurement(temperature=21.4),
+        ]
+    )
+    assert rows[0] == {
+        "pm25Index": 2,
+        "pm10Index": 1,
+        "no2Index": 1,
+        "o3Index": 2,
+        "so2Index": 1,
+        "airIndex": 2,
+    }
+    assert rows[1] == {"pm10Index": 1, "no2Index": 5, "airIndex": 5}
+    # nothing measured, no index
+    assert rows[2] == {}
+
+
+@pytest.mark.parametrize("pollutant", list(EAQI_BANDS))
+def test_every_band_of_every_pollutant(pollutant):
+    bounds = EAQI_BANDS[pollutant]
+    values = [*bounds, bounds[-1] + 1]
+    rows = european_aqi([EkoKartaZagrebMeasurement(**{pollutant: value}) for value in values])
+    assert [row["airIndex"] for row in rows] == [1, 2, 3, 4, 5, 6]
@@ -0,0 +1,68 @@
+"""Tests of the history backfill."""
+from datetime import date, datetime
+
+import pytest
+
+from homeassistant.components.recorder import statistics
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from custom_components.eko_karta_zagreb import backfill
+from custom_components.eko_karta_zagreb.backfill import (
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    EkoKartaZagrebBackfill,
+    statistic_id,
+)
+
+
+@pytest.fixture
+def imported(monkeypatch):
+    """Collect the statistics imported, per statistic ID and hour."""
+    rows = {}
+
+    def async_add_external_statistics(hass, metadata, stats):
+        rows.setdefault(metadata["statistic_id"], {}).update(
+            (row["start"], row["mean"]) for row in stats
+        )
+
+    monkeypatch.setattr(statistics, "async_add_external_statistics", async_add_external_statistics)
+    return rows
+
+
+def backfill_of(hass, checkpoints=None):
+    """Return a backfill with its own checkpoints."""
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+    return EkoKartaZagrebBackfill(hass, store, {} if checkpoints is None else checkpoints)
+
+
+async def test_history_is_imported(hass, upstream, imported):
+    """Recorded history pages are imported, skipping invalid weather and computing the air index."""
+    await backfill_of(hass).async_run("969", date(2024, 5, 28), date(2024, 6, 2))
+
+    assert upstream.requests["history"] == 1
+    assert len(imported[statistic_id("969", "pm10")]) == len(upstream.history) == 48
+    # the all-zero weather reading is left out
+    assert len(imported[statistic_id("969", "temperature")]) == 47
+    assert 0 not in imported[statistic_id("969", "pressure")].values()
+    # pm25 of 11.3 and o3 of 84 are both fair
+    assert set(imported[statistic_id("969", "airIndex")].values()) == {2}
+
+
+async def test_backfill_without_end_resumes_on_a_later_day(hass, upstream, imported, monkeypatch):
+    """An interrupted backfill keeps the end it was started with."""
+    checkpoints = {}
+    now = datetime(2024, 6, 2, 10, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    monkeypatch.setattr(backfill.dt_util, "now", lambda time_zone=None: now)
+    upstream.fail("history", 500, after=1)
+    await backfill_of(hass, checkpoints).async_run("969", date(2024, 5, 19))
+    assert checkpoints == {"969|2024-05-19": {"end": "2024-06-02", "next": "2024-05-26"}}
+    assert not imported
+
+    upstream.recover()
+    now = datetime(2024, 6, 5, 10, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    await backfill_of(hass, checkpoints).async_run("969", date(2024, 5, 19))
+    assert upstream.requests["history"] == 3
+    assert not checkpoints
+    assert len(imported[statistic_id("969", "pm10")]) == 48
+
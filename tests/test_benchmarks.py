@@ -0,0 +1,133 @@
+"""Benchmarks of setup and updates of all three platforms for 1, 10 and all stations.
+
+Run with ``pytest tests/test_benchmarks.py --benchmark-only``. Request
+counts and peak memory are reported in each benchmark's extra info.
+"""
+import asyncio
+import itertools
+import tracemalloc
+
+import pytest
+
+from custom_components.eko_karta_zagreb.coordinator import DATA_COORDINATORS
+
+from .conftest import SIMULATOR_PORT, async_start_hass
+from .simulator import UpstreamSimulator, synthetic_stations
+from .test_platforms import DOMAIN, async_setup_platforms
+
+# Air stations in the simulated catalogue, more than Zagreb has today
+ALL_STATIONS = 40
+
+ROUNDS = 3
+
+STATION_CONFIGS = {
+    "1": lambda ids: {"station_id": ids[0]},
+    "10": lambda ids: {"stations": ids[:10]},
+    "all": lambda ids: {"stations": "all"},
+}
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def simulator(loop):
+    simulator = UpstreamSimulator()
+    simulator.add_stations(synthetic_stations(ALL_STATIONS - len(simulator.air_station_ids)))
+    loop.run_until_complete(simulator.start(port=SIMULATOR_PORT))
+    yield simulator
+    loop.run_until_complete(simulator.close())
+
+
+@pytest.fixture
+def config_dirs(tmp_path):
+    """Return a fresh configuration directory per Home Assistant instance."""
+    counter = itertools.count()
+
+    def next_dir():
+        path = tmp_path / str(next(counter))
+        path.mkdir()
+        return str(path)
+
+    return next_dir
+
+
+@pytest.mark.parametrize("stations", list(STATION_CONFIGS))
+def test_setup(benchmark, loop, simulator, config_dirs, stations):
+    """First setup of all three platforms, downloading the catalogue and first measurements."""
+    config = STATION_CONFIGS[stations](simulator.air_station_ids)
+    instances = []
+
+    def setup():
+        hass = loop.run_until_complete(async_start_hass(config_dirs()))
+        instances.append(hass)
+        return (hass,), {}
+
+    def run(hass):
+        loop.run_until_complete(async_setup_platforms(hass, **config))
+
+    simulator.requests.clear()
+    benchmark.pedantic(run, setup=setup, rounds=ROUNDS)
+    requests = dict(simulator.requests)
+
+    # peak memory of one more setup
+    (hass,), _ = setup()
+    tracemalloc.start()
+    run(hass)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for hass in instances:
+        loop.run_until_complete(hass.async_stop(force=True))
+
+    count = len(instances[0].data[DOMAIN][DATA_COORDINATORS])
+    benchmark.extra_info.update(
+        stations=count,
+        requests_per_setup={endpoint: n / ROUNDS for endpoint, n in requests.items()},
+        peak_memory_kib=round(peak / 1024),
+    )
+    assert requests["air"] == requests["air_index"] == count * ROUNDS
+    assert requests["stations"] == ROUNDS
+
+
+@pytest.mark.parametrize("stations", list(STATION_CONFIGS))
+def test_update(benchmark, loop, simulator, config_dirs, stations):
+    """Refresh of every station with a new measurement, updating all entities."""
+    config = STATION_CONFIGS[stations](simulator.air_station_ids)
+    hass = loop.run_until_complete(async_start_hass(config_dirs()))
+    loop.run_until_complete(async_setup_platforms(hass, **config))
+    coordinators = list(hass.data[DOMAIN][DATA_COORDINATORS].values())
+
+    async def async_update():
+        await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+        await hass.async_block_till_done()
+
+    def setup():
+        simulator.advance()
+        return (), {}
+
+    def run():
+        loop.run_until_complete(async_update())
+
+    simulator.requests.clear()
+    benchmark.pedantic(run, setup=setup, rounds=ROUNDS * 3)
+    requests = sum(simulator.requests.values())
+
+    setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    loop.run_until_complete(hass.async_stop(force=True))
+
+    benchmark.extra_info.update(
+        stations=len(coordinators),
+        requests_per_update=requests / (ROUNDS * 3),
+        peak_memory_kib=round(peak / 1024),
+    )
+    # one air and one air index request per station, shared by all platforms
+    assert requests == 2 * len(coordinators) * ROUNDS * 3
@@ -0,0 +1,62 @@
+"""Tests of config entries and their options."""
+from homeassistant import data_entry_flow
+from homeassistant.setup import async_setup_component
+
+from custom_components.eko_karta_zagreb.coordinator import DATA_COORDINATORS
+
+from .test_platforms import DOMAIN
+
+
+async def async_create_entry(hass, station_id="969"):
+    """Configure a station through the config flow, return its entry."""
+    result = await hass.config_entries.flow.async_init(DOMAIN, context={"source": "user"})
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    result = await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"station_id": station_id}
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+    return result["result"]
+
+
+async def async_set_options(hass, entry, **options):
+    """Change the options of entry through the options flow."""
+    result = await hass.config_entries.options.async_init(entry.entry_id)
+    result = await hass.config_entries.options.async_configure(
+        result["flow_id"], {"monitored_conditions": ["temperature"], **options}
+    )
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    await hass.async_block_till_done()
+
+
+async def test_user_step_creates_station_entry(hass, upstream):
+    entry = await async_create_entry(hass)
+    assert entry.unique_id == "969"
+    assert entry.data["station_name"] == "Maksimir"
+    assert hass.states.get("weather.eko_karta_zagreb_maksimir").attributes["temperature"] == 21.4
+
+
+async def test_air_index_option_follows_reloads(hass, upstream):
+    entry = await async_create_entry(hass)
+    probe = hass.data[DOMAIN][DATA_COORDINATORS]["969"].probe
+
+    await async_set_options(hass, entry, air_index="local", diagnostics=True)
+    assert probe.fetch_air_index is False
+    assert probe.metrics is not None
+
+    await async_set_options(hass, entry, air_index="upstream", diagnostics=False)
+    assert probe.fetch_air_index is True
+    assert probe.metrics is None
+
+
+async def test_local_air_index_needs_every_consumer(hass, upstream):
+    """A YAML platform fetching the air index keeps it fetched for an entry computing it locally."""
+    assert await async_setup_component(
+        hass,
+        "sensor",
+        {"sensor": [{"platform": DOMAIN, "station_id": "969", "monitored_conditions": ["temperature"]}]},
+    )
+    await hass.async_block_till_done()
+    entry = await async_create_entry(hass)
+    await async_set_options(hass, entry, air_index="local")
+    assert hass.data[DOMAIN][DATA_COORDINATORS]["969"].probe.fetch_air_index is True
@@ -0,0 +1,69 @@
+"""Tests of the short-term measurement forecast."""
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.eko_karta_zagreb.forecast import FORECAST_HOURS, HoltForecaster
+from custom_components.eko_karta_zagreb.history import EkoKartaZagrebHistory
+from custom_components.eko_karta_zagreb.models import EkoKartaZagrebMeasurement
+
+T0 = 1717236000.0
+
+
+def forecaster_of(*samples, floor=None):
+    """Return a forecaster updated with (hour, value) samples."""
+    forecaster = HoltForecaster(floor)
+    for hour, value in samples:
+        forecaster.update(T0 + hour * 3600, value)
+    return forecaster
+
+
+def test_no_samples_no_forecast():
+    assert HoltForecaster().forecast() == []
+
+
+def test_constant_series_across_a_gap():
+    forecaster = forecaster_of((0, 5.0), (1, 5.0), (6, 5.0))
+    assert forecaster.trend == 0.0
+    assert forecaster.last_time == T0 + 6 * 3600
+    assert forecaster.forecast() == [5.0] * FORECAST_HOURS
+
+
+def test_gap_is_closed_at_the_same_hourly_trend():
+    # the same slope of 2 per hour, sampled an hour or three hours apart
+    hourly = forecaster_of((0, 10.0), (1, 12.0))
+    gap = forecaster_of((0, 10.0), (3, 16.0))
+    assert gap.last_time == T0 + 3 * 3600
+    assert gap.trend == pytest.approx(hourly.trend)
+    assert gap.trend > 0
+    forecast = gap.forecast()
+    assert forecast == sorted(forecast)
+    assert forecast[0] > gap.level
+
+
+def test_samples_within_the_hour_are_ignored():
+    forecaster = forecaster_of((0, 10.0), (1, 12.0))
+    before = (forecaster.level, forecaster.trend, forecaster.last_time)
+    forecaster.update(T0 + 4000, 30.0)
+    assert (forecaster.level, forecaster.trend, forecaster.last_time) == before
+
+
+def test_pollutants_are_floored_at_zero():
+    samples = ((0, 20.0), (1, 10.0), (2, 2.0))
+    unfloored = forecaster_of(*samples).forecast()
+    floored = forecaster_of(*samples, floor=0.0).forecast()
+    assert min(unfloored) < 0
+    assert floored == [max(value, 0.0) for value in unfloored]
+
+
+def test_history_forecast_follows_the_newest_sample():
+    history = EkoKartaZagrebHistory()
+    for hour, value in enumerate((20.0, 10.0, 2.0)):
+        measured = dt_util.utc_from_timestamp(T0 + hour * 3600)
+        history.add(
+            EkoKartaZagrebMeasurement(measurementDate=measured, weatherDate=measured, temperature=value, pm10=value)
+        )
+    forecast = history.forecast()
+    assert sorted(forecast) == [T0 + (2 + hour) * 3600 for hour in range(1, FORECAST_HOURS + 1)]
+    assert min(fields["pm10"] for fields in forecast.values()) == 0.0
+    assert min(fields["temperature"] for fields in forecast.values()) < 0
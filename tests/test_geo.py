@@ -0,0 +1,84 @@
+"""Tests of the station index and coordinate conversion."""
+import random
+
+import pytest
+
+from custom_components.eko_karta_zagreb.geo import (
+    StationIndex,
+    haversine,
+    htrs96_tm_to_wgs84,
+    idw_weights,
+)
+
+from .simulator import load_fixture, synthetic_stations
+
+
+def _random_stations(count, seed=1):
+    rng = random.Random(seed)
+    return {
+        str(k): (rng.uniform(45.6, 46.0), rng.uniform(15.7, 16.3), f"Station {k}")
+        for k in range(count)
+    }
+
+
+def _brute_force(stations, lat, lon):
+    return sorted(
+        (haversine(lat, lon, station[0], station[1]), station_id)
+        for station_id, station in stations.items()
+    )
+
+
+def test_kd_tree_matches_brute_force():
+    """Nearest, k-nearest and radius queries return the same stations as a linear scan."""
+    stations = _random_stations(500)
+    index = StationIndex(stations)
+    rng = random.Random(2)
+    for _ in range(200):
+        lat, lon = rng.uniform(45.5, 46.1), rng.uniform(15.6, 16.4)
+        expected = _brute_force(stations, lat, lon)
+
+        assert [station_id for station_id, _ in index.nearest(lat, lon)] == [expected[0][1]]
+        assert [station_id for station_id, _ in index.nearest(lat, lon, k=5)] == [
+            station_id for _, station_id in expected[:5]
+        ]
+        radius = rng.uniform(1, 15)
+        assert {station_id for station_id, _ in index.within(lat, lon, radius)} == {
+            station_id for distance, station_id in expected if distance <= radius
+        }
+
+
+def test_nearest_uses_great_circle_distance():
+    """At Zagreb's latitude a degree of longitude is shorter than a degree of latitude."""
+    stations = {"north": (45.82, 16.0, "North"), "east": (45.8, 16.025, "East")}
+    # 0.02° north is ~2.2 km, 0.025° east only ~1.9 km
+    assert StationIndex(stations).nearest(45.8, 16.0)[0][0] == "east"
+
+
+def test_nearest_many():
+    stations = _random_stations(50)
+    index = StationIndex(stations)
+    points = [(45.7, 15.9), (45.9, 16.1)]
+    assert index.nearest_many(points, k=2) == [index.nearest(*point, k=2) for point in points]
+
+
+def test_kruger_series_matches_pyproj():
+    """The local inverse transverse Mercator agrees with PROJ to well under a metre."""
+    pyproj = pytest.importorskip("pyproj")
+    transformer = pyproj.Transformer.from_crs("EPSG:3765", "EPSG:4326", always_xy=True)
+    catalogue = load_fixture("stations.json") + synthetic_stations(200)
+    eastings = [station["coordinateX"] for station in catalogue]
+    northings = [station["coordinateY"] for station in catalogue]
+    # also the corners of Croatia, far from the central meridian
+    eastings += [280000.0, 750000.0, 280000.0, 750000.0]
+    northings += [4700000.0, 4700000.0, 5150000.0, 5150000.0]
+
+    converted = htrs96_tm_to_wgs84(eastings, northings)
+    for (lat, lon), easting, northing in zip(converted, eastings, northings):
+        expected_lon, expected_lat = transformer.transform(easting, northing)
+        assert haversine(lat, lon, expected_lat, expected_lon) < 0.001  # km
+
+
+def test_idw_weights():
+    weights = idw_weights([1.0, 2.0, 0.0])
+    assert sum(weights) == pytest.approx(1.0)
+    assert weights[2] > weights[0] > weights[1]
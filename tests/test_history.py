@@ -0,0 +1,92 @@
+"""Tests of the rolling measurement history."""
+from datetime import timedelta
+import random
+
+import pytest
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.eko_karta_zagreb.history import (
+    HISTORY_WINDOWS,
+    EkoKartaZagrebHistory,
+    RollingSeries,
+)
+from custom_components.eko_karta_zagreb.models import EkoKartaZagrebMeasurement
+
+T0 = 1717236000.0
+
+
+def brute_force(samples, window):
+    """Return the mean and least squares slope per hour of the samples of the last window hours."""
+    newest = samples[-1][0]
+    recent = [(t / 3600, y) for t, y in samples if t > newest - window * 3600]
+    n = len(recent)
+    mean = sum(y for _, y in recent) / n
+    if n < 2:
+        return mean, None
+    mean_x = sum(x for x, _ in recent) / n
+    slope = sum((x - mean_x) * (y - mean) for x, y in recent) / sum((x - mean_x) ** 2 for x, _ in recent)
+    return mean, slope
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rolling_windows_match_brute_force(seed):
+    """Incremental means and slopes match a recomputation, also across gaps and laps."""
+    rng = random.Random(seed)
+    series = RollingSeries()
+    samples = []
+    timestamp = T0
+    for _ in range(200):
+        # mostly hourly, sometimes after an outage
+        timestamp += 3600 * (1 if rng.random() < 0.85 else rng.randint(2, 15))
+        value = rng.uniform(-10, 40)
+        series.push(timestamp, value)
+        samples.append((timestamp, value))
+        for window in HISTORY_WINDOWS:
+            mean, slope = brute_force(samples, window)
+            assert series.mean(window) == pytest.approx(mean)
+            if slope is None:
+                assert series.slope(window) is None
+            else:
+                assert series.slope(window) == pytest.approx(slope, abs=1e-9)
+    assert list(series) == samples[-len(series) :]
+
+
+def test_windows_count_hours_not_samples():
+    series = RollingSeries()
+    for hour, value in enumerate([10.0, 12.0, 14.0, 16.0]):
+        series.push(T0 + hour * 3600, value)
+    assert series.mean(3) == 14.0
+    assert series.slope(3) == pytest.approx(2.0)
+
+    # ten hours later, only the newest sample is of the last 3 hours
+    series.push(T0 + 13 * 3600, 30.0)
+    assert series.mean(3) == 30.0
+    assert series.slope(3) is None
+    assert series.mean(24) == pytest.approx(16.4)
+
+
+def test_held_over_weather_isnt_a_new_sample():
+    measured = dt_util.utc_from_timestamp(T0)
+    history = EkoKartaZagrebHistory()
+    history.add(
+        EkoKartaZagrebMeasurement(measurementDate=measured, weatherDate=measured, temperature=21.4, pm10=18.2)
+    )
+    # all-zero weather readings keep the older values
+    later = measured + timedelta(hours=1)
+    assert history.add(
+        EkoKartaZagrebMeasurement(measurementDate=later, weatherDate=measured, temperature=21.4, pm10=20.0)
+    )
+    assert len(history.series["temperature"]) == 1
+    assert len(history.series["pm10"]) == 2
+    assert history.forecasters["temperature"].last_time == T0
+
+
+def test_history_survives_storage():
+    history = EkoKartaZagrebHistory()
+    for hour in range(30):
+        measured = dt_util.utc_from_timestamp(T0 + hour * 3600)
+        history.add(EkoKartaZagrebMeasurement(measurementDate=measured, weatherDate=measured, temperature=hour))
+    restored = EkoKartaZagrebHistory(history.as_dict())
+    assert restored.attributes("temperature") == history.attributes("temperature")
+    assert restored.attributes("temperature")["Average 3h"] == 28.0
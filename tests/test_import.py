@@ -0,0 +1,54 @@
+"""Regression benchmark of the integration's import time."""
+import importlib
+import sys
+
+import pytest
+
+# Imported once by Home Assistant whatever the integration does
+import homeassistant.components.air_quality  # noqa: F401
+import homeassistant.components.sensor  # noqa: F401
+import homeassistant.components.weather  # noqa: F401
+import homeassistant.helpers.storage  # noqa: F401
+import homeassistant.helpers.update_coordinator  # noqa: F401
+
+PACKAGE = "custom_components.eko_karta_zagreb"
+
+# Modules only loaded on first use
+LAZY_MODULES = ("backfill", "config_flow", "metrics", "share")
+
+# Budget of importing the package and all platforms, in seconds, well above what
+# it takes, so only a heavy import slipping in breaks it
+IMPORT_BUDGET = 0.1
+
+
+@pytest.fixture
+def fresh_import():
+    """Import integration modules from scratch, restoring the loaded ones afterwards."""
+    loaded = {name: module for name, module in sys.modules.items() if name.startswith(PACKAGE)}
+
+    def run(*names):
+        for name in [name for name in sys.modules if name.startswith(PACKAGE)]:
+            del sys.modules[name]
+        for name in names:
+            importlib.import_module(f"{PACKAGE}.{name}")
+        return {name[len(PACKAGE) + 1 :] for name in sys.modules if name.startswith(PACKAGE + ".")}
+
+    yield run
+    for name in [name for name in sys.modules if name.startswith(PACKAGE)]:
+        del sys.modules[name]
+    sys.modules.update(loaded)
+
+
+@pytest.mark.parametrize("platform", ["weather", "air_quality"])
+def test_platform_imports_only_the_core(fresh_import, platform):
+    """The weather and air quality platforms don't load the sensor platform."""
+    modules = fresh_import(platform)
+    assert "sensor" not in modules
+    assert not modules.intersection(LAZY_MODULES)
+
+
+def test_import_time(benchmark, fresh_import):
+    modules = benchmark(fresh_import, "sensor", "weather", "air_quality")
+    assert not modules.intersection(LAZY_MODULES)
+    if benchmark.stats is not None:
+        assert benchmark.stats.stats.median < IMPORT_BUDGET
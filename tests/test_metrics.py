@@ -0,0 +1,52 @@
+"""Tests of the update timing and traffic metrics."""
+from custom_components.eko_karta_zagreb.metrics import (
+    HISTOGRAM_BUCKETS,
+    EkoKartaZagrebMetrics,
+    LatencyHistogram,
+)
+
+
+def test_empty_histogram():
+    summary = LatencyHistogram().as_dict()
+    assert summary["count"] == 0
+    assert summary["mean"] is None
+    assert summary["p95"] is None
+    assert summary["last"] is None
+
+
+def test_bucket_upper_bounds_are_inclusive():
+    histogram = LatencyHistogram()
+    for seconds in (0.005, 0.0051, 0.02, 45.0):
+        histogram.observe(seconds)
+    summary = histogram.as_dict()
+    assert summary["buckets"]["5"] == 1
+    assert summary["buckets"]["10"] == 1
+    assert summary["buckets"]["25"] == 1
+    assert summary["buckets"]["inf"] == 1
+    assert sum(summary["buckets"].values()) == summary["count"] == 4
+    assert list(summary["buckets"]) == [*map(str, HISTOGRAM_BUCKETS), "inf"]
+
+
+def test_quantiles_are_bucket_bounds():
+    histogram = LatencyHistogram()
+    for seconds in (0.001, 0.002, 0.02, 45.0):
+        histogram.observe(seconds)
+    summary = histogram.as_dict()
+    assert summary["p50"] == 5
+    assert summary["p95"] == 45000.0
+    assert summary["max"] == 45000.0
+    assert summary["last"] == 45000.0
+    assert summary["mean"] == round((1 + 2 + 20 + 45000) / 4, 1)
+
+
+def test_fetches_are_tracked_per_endpoint():
+    metrics = EkoKartaZagrebMetrics()
+    metrics.observe_fetch("air", 0.01, 400)
+    metrics.observe_fetch("air", 0.02, 0)
+    metrics.observe_fetch("air_index", 0.01, 140)
+    assert metrics.bytes == {"air": 400, "air_index": 140}
+    assert metrics.bytes_received == 540
+    summary = metrics.as_dict()
+    assert summary["latency"]["air"]["count"] == 2
+    assert summary["latency"]["air_index"]["count"] == 1
+    assert summary["parse"]["count"] == 0
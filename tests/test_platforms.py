@@ -0,0 +1,272 @@
+"""Tests of the sensor, weather and air quality platforms."""
+import asyncio
+from datetime import timedelta
+
+from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+
+from custom_components.eko_karta_zagreb import sensor
+from custom_components.eko_karta_zagreb.coordinator import DATA_COORDINATORS
+
+DOMAIN = "eko_karta_zagreb"
+
+
+def platform_config(**config):
+    """Return YAML configuration of all three platforms."""
+    return {
+        "sensor": [
+            {
+                "platform": DOMAIN,
+                "monitored_conditions": ["temperature", "particulate_matter_10", "air_quality_index"],
+                **config,
+            }
+        ],
+        "weather": [{"platform": DOMAIN, **config}],
+        "air_quality": [{"platform": DOMAIN, **config}],
+    }
+
+
+async def async_setup_platforms(hass, **config):
+    """Set up all three platforms."""
+    for domain, domain_config in platform_config(**config).items():
+        assert await async_setup_component(hass, domain, {domain: domain_config})
+    await hass.async_block_till_done()
+
+
+async def test_closest_station(hass, upstream):
+    """Without a station, the one closest to home is used."""
+    await async_setup_platforms(hass)
+    assert list(hass.data[DOMAIN][DATA_COORDINATORS]) == ["427"]
+    assert hass.states.get("sensor.eko_karta_zagreb_temperature").state == "21.4"
+
+
+async def test_platforms_share_one_fetch(hass, upstream):
+    await async_setup_platforms(hass, station_id="969")
+    assert hass.states.get("sensor.eko_karta_zagreb_temperature").state == "21.4"
+    assert hass.states.get("sensor.eko_karta_zagreb_pm10").state == "18.2"
+    weather = hass.states.get("weather.eko_karta_zagreb")
+    # the stations measure no condition, the temperature is only an attribute
+    assert weather.state == "unknown"
+    assert weather.attributes["temperature"] == 21.4
+    assert hass.states.get("air_quality.eko_karta_zagreb").attributes["particulate_matter_10"] == 18.2
+    assert upstream.station_requests == {"969": 2}
+
+    coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["969"]
+    upstream.advance()
+    upstream.air["pm10"] = 25.0
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.eko_karta_zagreb_pm10").state == "25.0"
+    assert upstream.station_requests == {"969": 4}
+
+
+async def test_all_stations(hass, upstream):
+    await async_setup_platforms(hass, stations="all")
+    assert sorted(hass.data[DOMAIN][DATA_COORDINATORS]) == sorted(upstream.air_station_ids)
+    assert len(hass.states.async_entity_ids("weather")) == len(upstream.air_station_ids)
+    assert hass.states.get("sensor.eko_karta_zagreb_siget_temperature").state == "21.4"
+
+
+async def test_entities_available_without_index_endpoint(hass, upstream):
+    upstream.fail("air_index", 404)
+    await async_setup_platforms(hass, station_id="969")
+    state = hass.states.get("sensor.eko_karta_zagreb_temperature")
+    assert state.state == "21.4"
+    assert state.attributes["stale"] is False
+    assert hass.states.get("sensor.eko_karta_zagreb_aqi").state == "2.0"
+
+
+async def test_interpolation_leaves_out_invalid_weather(hass, upstream):
+    """A station whose weather sensors read all zero doesn't contribute its older values."""
+    upstream.overrides["426"] = {"temperature": 11.4}
+    # only recent measurements are interpolated
+    upstream.air["measurementDate"] = int(dt_util.utcnow().timestamp() // 3600 * 3600000)
+    upstream.air_index["measurementDate"] = upstream.air["measurementDate"]
+    # nearest to Mirogojska and Ksaverska cesta
+    assert await async_setup_component(
+        hass,
+        "sensor",
+        {
+            "sensor": [
+                {
+                    "platform": DOMAIN,
+                    "interpolate": 2,
+                    "latitude": 45.832,
+                    "longitude": 15.9983,
+                    "monitored_conditions": ["temperature", "particulate_matter_10"],
+                }
+            ]
+        },
+    )
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.eko_karta_zagreb_temperature")
+    assert 11.4 < float(state.state) < 21.4
+    assert sorted(state.attributes["stations"]) == ["Ksaverska cesta", "Mirogojska"]
+
+    upstream.zero_readings.add("426")
+    upstream.advance()
+    for coordinator in hass.data[DOMAIN][DATA_COORDINATORS].values():
+        await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.eko_karta_zagreb_temperature")
+    assert state.state == "21.4"
+    assert state.attributes["stations"] == ["Ksaverska cesta"]
+    assert len(hass.states.get("sensor.eko_karta_zagreb_pm10").attributes["stations"]) == 2
+
+
+async def test_air_quality_state_follows_a_later_air_index(hass, upstream):
+    """An air index merged after its measurement updates the state, not only the attribute."""
+    await async_setup_platforms(hass, station_id="969")
+    coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["969"]
+    upstream.advance()
+    upstream.air_index["measurementDate"] -= 3600000
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    # computed locally until the air index endpoint catches up
+    assert hass.states.get("air_quality.eko_karta_zagreb").state == "2.0"
+
+    upstream.air_index.update(measurementDate=upstream.air["measurementDate"], airIndex=3)
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    state = hass.states.get("air_quality.eko_karta_zagreb")
+    assert state.state == "3.0"
+    assert state.attributes["air_quality_index"] == 3
+
+
+async def test_interpolation_drops_stations_aging_out(hass, upstream, monkeypatch):
+    """Stations that stop updating are left out once too old, without any new update."""
+    monkeypatch.setattr(sensor, "INTERPOLATION_CHECK_INTERVAL", timedelta(milliseconds=100))
+    # ages out just after setup
+    aged_out = dt_util.utcnow() - sensor.INTERPOLATION_MAX_AGE + timedelta(milliseconds=300)
+    upstream.air["measurementDate"] = int(aged_out.timestamp() * 1000)
+    upstream.air_index["measurementDate"] = upstream.air["measurementDate"]
+    assert await async_setup_component(
+        hass,
+        "sensor",
+        {"sensor": [{"platform": DOMAIN, "interpolate": 2, "monitored_conditions": ["temperature"]}]},
+    )
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.eko_karta_zagreb_temperature")
+    assert state.state == "21.4"
+    assert len(state.attributes["stations"]) == 2
+
+    await asyncio.sleep(0.5)
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.eko_karta_zagreb_temperature")
+    assert state.state == "unknown"
+    assert state.attributes["stations"] == []
+
+
+async def test_many_stations_dont_wait_for_first_fetches(hass, upstream):
+    """Entities of many stations are added at once, and become available once fetched."""
+    upstream.set_latency(1.0, "air")
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.wait_for(
+        asyncio.gather(
+            *(
+                async_setup_component(hass, domain, {domain: domain_config})
+                for domain, domain_config in platform_config(stations="all").items()
+            )
+        ),
+        0.8,
+    )
+    while len(hass.states.async_entity_ids("weather")) < len(upstream.air_station_ids):
+        await asyncio.sleep(0.01)
+    assert loop.time() - started < 1.0
+    assert hass.states.get("sensor.eko_karta_zagreb_siget_temperature").state == "unavailable"
+
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.eko_karta_zagreb_siget_temperature").state == "21.4"
+
+
+async def test_sensors_are_sensor_entities(hass, upstream, caplog):
+    """Every sensor reaches Home Assistant with its state class and a valid unit."""
+    assert await async_setup_component(
+        hass,
+        "sensor",
+        {
+            "sensor": [
+                {
+                    "platform": DOMAIN,
+                    "station_id": "969",
+                    "monitored_conditions": list(sensor.SENSOR_TYPES),
+                    "diagnostics": True,
+                }
+            ]
+        },
+    )
+    await hass.async_block_till_done()
+    state = hass.states.get("sensor.eko_karta_zagreb_pm10")
+    assert state.state == "18.2"
+    assert state.attributes["state_class"] == "measurement"
+    assert state.attributes["unit_of_measurement"] == "µg/m³"
+    update = hass.states.get("sensor.eko_karta_zagreb_update")
+    assert update.state == "2024-06-01T10:00:00+00:00"
+    assert hass.states.get("sensor.eko_karta_zagreb_bytes_received").attributes["state_class"] == "total_increasing"
+    assert "homeassistant.components.sensor" not in {record.name for record in caplog.records}
+
+
+async def test_only_entities_showing_changed_fields_are_written(hass, upstream):
+    """An index-only change writes the affected sensor, skipping every other entity."""
+    await async_setup_platforms(hass, station_id="969")
+    coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["969"]
+    probe = coordinator.probe
+    skipped = probe.stats["skipped_writes"]
+
+    upstream.air_index["pm10Index"] = 2
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert probe.changed_fields == {"pm10Index"}
+    assert hass.states.get("sensor.eko_karta_zagreb_pm10").attributes["Index"] == 2
+    # temperature and AQI sensors, weather and air quality
+    assert probe.stats["skipped_writes"] == skipped + 4
+
+    # a revision the entities never saw, then another index-only change
+    upstream.air["temperature"] = 25.0
+    upstream.advance()
+    await probe.async_update()
+    upstream.air_index["pm10Index"] = 3
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert probe.changed_fields == {"pm10Index"}
+    assert hass.states.get("sensor.eko_karta_zagreb_temperature").state == "25.0"
+    assert hass.states.get("weather.eko_karta_zagreb").attributes["temperature"] == 25.0
+    assert probe.stats["skipped_writes"] == skipped + 4
+
+
+async def test_diagnostic_sensors(hass, upstream):
+    """The diagnostic sensors show update timing per stage and bytes per endpoint."""
+    assert await async_setup_component(
+        hass,
+        "sensor",
+        {
+            "sensor": [
+                {
+                    "platform": DOMAIN,
+                    "station_id": "969",
+                    "monitored_conditions": ["temperature"],
+                    "diagnostics": True,
+                }
+            ]
+        },
+    )
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["969"]
+    # metrics are collected from the update after the consumer asked for them
+    assert hass.states.get("sensor.eko_karta_zagreb_update_latency").state == "unknown"
+
+    upstream.advance()
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    latency = hass.states.get("sensor.eko_karta_zagreb_update_latency")
+    assert float(latency.state) == latency.attributes["update max"]
+    for stage in ("fetch air", "fetch air_index", "parse", "update", "write"):
+        assert latency.attributes[f"{stage} mean"] is not None
+        assert latency.attributes[f"{stage} p95"] >= latency.attributes[f"{stage} mean"]
+
+    received = hass.states.get("sensor.eko_karta_zagreb_bytes_received")
+    assert received.attributes["bytes air"] > 0
+    assert received.attributes["bytes air_index"] > 0
+    assert int(received.state) == received.attributes["bytes air"] + received.attributes["bytes air_index"]
+    assert received.attributes["requests"] == coordinator.probe.stats["requests"]
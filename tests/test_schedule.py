@@ -0,0 +1,64 @@
+"""Simulation of the polling schedule against a station publishing hourly."""
+import random
+import statistics
+
+import pytest
+
+from custom_components.eko_karta_zagreb.coordinator import (
+    BACKOFF_MAX,
+    MEASUREMENT_PERIOD,
+    EkoKartaZagrebSchedule,
+)
+
+
+def simulate(lag, jitter, hours=96, seed=0, outage=None):
+    """Poll a station whose hourly measurements appear lag ± jitter seconds late.
+
+    Return the schedule, the number of polls, and the delays between each
+    measurement appearing and it being fetched.
+    """
+    rng = random.Random(seed)
+    published = {
+        hour: hour * MEASUREMENT_PERIOD + lag + rng.uniform(-jitter, jitter)
+        for hour in range(hours + 2)
+    }
+    if outage is not None:
+        # measurements of these hours all appear once the outage is over
+        first, last = outage
+        for hour in range(first, last):
+            published[hour] = max(published[hour], published[last])
+
+    schedule = EkoKartaZagrebSchedule()
+    now = MEASUREMENT_PERIOD + lag + 1
+    polls = 0
+    fetched = {}
+    while now < hours * MEASUREMENT_PERIOD:
+        polls += 1
+        available = [hour for hour, at in published.items() if at <= now]
+        measured = max(available) * MEASUREMENT_PERIOD if available else None
+        if available and max(available) not in fetched:
+            fetched[max(available)] = now - published[max(available)]
+        now += schedule.next_interval(measured, now)
+    return schedule, polls, fetched
+
+
+@pytest.mark.parametrize("lag", [300.0, 600.0, 1500.0])
+def test_schedule_learns_publication_lag(lag):
+    schedule, polls, fetched = simulate(lag, jitter=60.0)
+    assert schedule.lag == pytest.approx(lag, abs=180.0)
+    delays = list(fetched.values())[24:]
+    # after learning, new data is picked up within a few minutes of appearing
+    assert statistics.median(delays) < 300.0
+    # at most a couple of polls per measurement
+    assert polls < 2.5 * len(fetched)
+
+
+def test_schedule_backs_off_during_outage():
+    """While measurements are late, polls back off up to BACKOFF_MAX apart."""
+    _, baseline_polls, _ = simulate(600.0, jitter=30.0)
+    _, polls, fetched = simulate(600.0, jitter=30.0, outage=(40, 52))
+    outage_hours = 12
+    # a handful of polls while backing off, then one per BACKOFF_MAX
+    assert polls - baseline_polls <= outage_hours * MEASUREMENT_PERIOD / BACKOFF_MAX + 5
+    # the first measurement after the outage is fetched within one back-off
+    assert fetched[52] <= BACKOFF_MAX * 1.2
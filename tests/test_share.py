@@ -0,0 +1,92 @@
+"""Tests of publishing snapshots to other instances."""
+from datetime import timedelta
+
+import aiohttp
+import pytest
+
+from homeassistant.auth import auth_manager_from_config
+from homeassistant.setup import async_setup_component
+
+from custom_components.eko_karta_zagreb.api import EkoKartaZagrebData
+from custom_components.eko_karta_zagreb.const import SNAPSHOT_API_PATH
+from custom_components.eko_karta_zagreb.coordinator import DATA_COORDINATORS
+
+from .conftest import _free_port
+
+DOMAIN = "eko_karta_zagreb"
+
+
+@pytest.fixture
+async def publisher(hass, upstream):
+    """Return the URL of an instance publishing the snapshots of the stations it polls."""
+    port = _free_port()
+    hass.auth = await auth_manager_from_config(hass, [], [])
+    assert await async_setup_component(
+        hass, "http", {"http": {"server_host": "127.0.0.1", "server_port": port}}
+    )
+    assert await async_setup_component(hass, DOMAIN, {DOMAIN: {"publish": True}})
+    assert await async_setup_component(
+        hass, "sensor", {"sensor": [{"platform": DOMAIN, "station_id": "969"}]}
+    )
+    await hass.async_start()
+    await hass.async_block_till_done()
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+async def session():
+    async with aiohttp.ClientSession() as session:
+        yield session
+
+
+async def test_only_polled_stations_are_published(hass, publisher, session):
+    """Requesting another station neither serves it nor makes the publisher poll it."""
+    async with session.get(publisher + SNAPSHOT_API_PATH.format("969")) as response:
+        assert response.status == 200
+        snapshot = await response.json()
+    assert snapshot["version"] == 1
+    assert snapshot["staleSince"] is None
+    assert snapshot["temperature"] == 21.4
+
+    async with session.get(publisher + SNAPSHOT_API_PATH.format("426")) as response:
+        assert response.status == 404
+    assert list(hass.data[DOMAIN][DATA_COORDINATORS]) == ["969"]
+
+
+async def test_consumer_is_as_stale_as_the_publisher(hass, upstream, publisher, session):
+    """A consumer reaching the publisher still marks a station stale the publisher can't update."""
+    consumer = EkoKartaZagrebData(session, "969", source=publisher)
+    await consumer.async_update()
+    assert consumer.stale_since is None
+    assert consumer.measurement.temperature == 21.4
+
+    upstream.fail("air", 404)
+    coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["969"]
+    await coordinator.async_refresh()
+    stale_since = coordinator.probe.stale_since
+    assert stale_since is not None
+
+    await consumer.async_update()
+    # shared at millisecond resolution
+    assert abs(consumer.stale_since - stale_since) < timedelta(milliseconds=1)
+    assert consumer.last_success is not None
+
+    upstream.recover()
+    upstream.advance()
+    await coordinator.async_refresh()
+    await consumer.async_update()
+    assert consumer.stale_since is None
+
+
+async def test_consumer_keeps_held_over_weather(hass, upstream, publisher, session):
+    """Weather the publisher holds over from an older measurement isn't fresh on a consumer."""
+    coordinator = hass.data[DOMAIN][DATA_COORDINATORS]["969"]
+    upstream.zero_readings.add("969")
+    upstream.advance()
+    await coordinator.async_refresh()
+
+    consumer = EkoKartaZagrebData(session, "969", source=publisher)
+    await consumer.async_update()
+    assert consumer.measurement.temperature == 21.4
+    assert consumer.measurement.weatherDate == coordinator.probe.measurement.weatherDate
+    assert consumer.measurement.weatherDate < consumer.measurement.measurementDate
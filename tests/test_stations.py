@@ -0,0 +1,96 @@
+"""Tests of the streamed station catalogue."""
+import json
+import tracemalloc
+
+import aiohttp
+import pytest
+
+from custom_components.eko_karta_zagreb.api import (
+    async_ekokartazagreb_stations,
+    async_iter_json_array,
+)
+from custom_components.eko_karta_zagreb.stations import async_get_stations
+
+from .simulator import synthetic_stations
+
+
+class _ChunkedContent:
+    """Response body delivered in fixed size chunks."""
+
+    def __init__(self, body, size):
+        self._body = body
+        self._size = size
+
+    async def iter_chunked(self, _chunk_size):
+        for start in range(0, len(self._body), self._size):
+            yield self._body[start : start + self._size]
+
+
+class _ChunkedResponse:
+    def __init__(self, body, size):
+        self.content = _ChunkedContent(body, size)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 100000])
+async def test_iter_json_array_across_chunk_boundaries(chunk_size):
+    """Elements split anywhere, also inside multi-byte characters, are decoded whole."""
+    elems = [{"id": 1, "name": "Đordićeva"}, [1, 2, {"a": "}]"}], "x,y", 3.5, None]
+    body = (" [\n" + " ,\n".join(json.dumps(elem, ensure_ascii=False) for elem in elems) + "]\n").encode()
+    decoded = [elem async for elem in async_iter_json_array(_ChunkedResponse(body, chunk_size))]
+    assert decoded == elems
+
+
+@pytest.mark.parametrize("body", [b'{"id": 1}', b'[{"id": 1}, {"id": 2}'])
+async def test_iter_json_array_rejects_invalid(body):
+    with pytest.raises(json.JSONDecodeError):
+        [elem async for elem in async_iter_json_array(_ChunkedResponse(body, 4))]
+
+
+async def test_catalogue_keeps_air_stations(upstream):
+    async with aiohttp.ClientSession() as session:
+        stations = await async_ekokartazagreb_stations(session)
+    assert sorted(stations) == sorted(upstream.air_station_ids)
+    lat, lon, name = stations["969"]
+    assert name == "Maksimir"
+    assert lat == pytest.approx(45.8296, abs=1e-5)
+    assert lon == pytest.approx(16.0185, abs=1e-5)
+
+
+async def test_catalogue_of_20k_stations_streams(upstream):
+    """Peak memory of streaming scales with the kept air stations, not the full catalogue."""
+    upstream.add_stations(synthetic_stations(18000, measurement_type="voda"))
+    upstream.add_stations(synthetic_stations(2000, first_id=50000))
+    async with aiohttp.ClientSession() as session:
+        async with session.get(upstream_url(upstream) + "stations/") as response:
+            body = await response.read()
+
+        tracemalloc.start()
+        json.loads(body)
+        _, loaded_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tracemalloc.start()
+        stations = await async_ekokartazagreb_stations(session)
+        _, streamed_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    assert len(stations) == len(upstream.air_station_ids) == 2005
+    assert streamed_peak < loaded_peak / 2
+
+
+async def test_catalogue_is_cached(hass, upstream):
+    """The catalogue is downloaded once, then loaded from storage."""
+    from datetime import timedelta
+
+    stations = await async_get_stations(hass, timedelta(days=7))
+    assert sorted(stations) == sorted(upstream.air_station_ids)
+    assert upstream.requests["stations"] == 1
+    assert await async_get_stations(hass, timedelta(days=7)) is stations
+    assert upstream.requests["stations"] == 1
+
+
+def upstream_url(upstream):
+    """Return the base URL the integration was pointed at."""
+    from custom_components.eko_karta_zagreb.const import EKOKARTAZAGREB_API_URL
+
+    return EKOKARTAZAGREB_API_URL